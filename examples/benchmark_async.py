@@ -0,0 +1,87 @@
+"""
+Compares the throughput of blocking queries against many concurrent
+coroutines using the async query API, for several pool sizes.
+
+Every query looks up a single row by an unindexed column, so almost all of
+its time is spent scanning the table inside SQLite (which releases the GIL)
+rather than hydrating models in Python. That is the work the worker threads
+can run in parallel, so the async rate grows with the pool size up to the
+number of CPU cores.
+
+    python -m examples.benchmark_async
+"""
+
+from giraffe_orm.connections import Database, set_database, execute_script
+
+from .models import Giraffe
+
+import tempfile
+import asyncio
+import time
+import os
+
+
+ROWS = 200_000
+QUERIES = 400
+COROUTINES = 64
+POOL_SIZES = (1, 2, 4, 8)
+
+
+def _setup(path: str) -> None:
+    set_database(Database(path, wal=True))
+
+    execute_script(f"""
+        CREATE TABLE giraffes (primary_key VARCHAR(10) PRIMARY KEY, number INTEGER DEFAULT 0, date DATE DEFAULT CURRENT_TIMESTAMP);
+
+        WITH RECURSIVE numbers(i) AS (SELECT 0 UNION ALL SELECT i + 1 FROM numbers WHERE i + 1 < {ROWS})
+        INSERT INTO giraffes (primary_key, number) SELECT i, i FROM numbers;
+    """)
+
+
+def _number(i: int) -> int:
+    # Spread the lookups over the table, so no two queries are identical
+    # (and none is answered by the result cache)
+    return (i * 7919) % ROWS
+
+
+def _bench_sync() -> float:
+    start = time.perf_counter()
+
+    for i in range(QUERIES):
+        Giraffe.query.filter(Giraffe.number == _number(i)).first()
+
+    return QUERIES / (time.perf_counter() - start)
+
+
+async def _bench_async() -> float:
+    semaphore = asyncio.Semaphore(COROUTINES)
+
+    async def worker(i: int) -> None:
+        async with semaphore:
+            await Giraffe.query.filter(Giraffe.number == _number(i)).first_async()
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker(i) for i in range(QUERIES)))
+
+    return QUERIES / (time.perf_counter() - start)
+
+
+def main() -> None:
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "benchmark.sqlite3")
+        _setup(path)
+
+        print(f"{os.cpu_count()} CPU cores")
+        print(f"blocking:{'':14} {_bench_sync():10.1f} queries/s")
+
+        for pool_size in POOL_SIZES:
+            set_database(Database(path, pool_size=pool_size, wal=True)).close()
+            rate = asyncio.run(_bench_async())
+
+            print(f"{COROUTINES} coroutines, pool {pool_size}: {rate:10.1f} queries/s")
+
+        set_database(Database()).close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+"""
+Compares the memory and time of loading numeric columns as a list of tuples
+(`with_fields().all()`) and as arrays (`with_fields().columns()`).
+
+    python -m examples.benchmark_columns
+"""
+
+from giraffe_orm.connections import Database, set_database, execute_script, change_many
+
+from .models import Giraffe
+
+import typing as t
+import tracemalloc
+import tempfile
+import time
+import os
+
+
+ROWS = 1_000_000
+
+
+def _setup(path: str) -> None:
+    set_database(Database(path))
+
+    execute_script(
+        "CREATE TABLE giraffes (primary_key VARCHAR(10) PRIMARY KEY, number INTEGER DEFAULT 0, date DATE DEFAULT CURRENT_TIMESTAMP);"
+    )
+
+    change_many([(
+        "INSERT INTO giraffes (primary_key, number) VALUES (?, ?)",
+        [(str(i), i) for i in range(ROWS)]
+    )])
+
+
+def _bench(name: str, load: t.Callable[[], t.Any]) -> None:
+    start = time.perf_counter()
+    load()
+    duration = time.perf_counter() - start
+
+    tracemalloc.start()
+    result = load()
+    memory, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    del result
+    print(f"{name:<8} {ROWS / duration:12.0f} rows/s {memory / ROWS:8.1f} bytes/row")
+
+
+def main() -> None:
+    with tempfile.TemporaryDirectory() as directory:
+        _setup(os.path.join(directory, "benchmark.sqlite3"))
+
+        query = Giraffe.query.with_fields(Giraffe.number)
+
+        _bench("tuples", query.all)
+        _bench("columns", query.columns)
+
+        set_database(Database())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+"""
+Measures how many rows per second are turned into Model instances, for the
+hydrator used by queries and for constructing instances through `__init__`.
+
+    python -m examples.benchmark_hydration
+"""
+
+from giraffe_orm.connections import Database, set_database, execute_script, change_many
+
+from .models import Giraffe
+
+import typing as t
+import tracemalloc
+import tempfile
+import time
+import os
+
+
+ROWS = 200_000
+
+
+def _setup(path: str) -> None:
+    set_database(Database(path))
+
+    execute_script(
+        "CREATE TABLE giraffes (primary_key VARCHAR(10) PRIMARY KEY, number INTEGER DEFAULT 0, date DATE DEFAULT CURRENT_TIMESTAMP);"
+    )
+
+    change_many([(
+        "INSERT INTO giraffes (primary_key, number, date) VALUES (?, ?, ?)",
+        [(str(i), i, "2024-01-01") for i in range(ROWS)]
+    )])
+
+
+def _bench(name: str, hydrate: t.Callable[[list[tuple[t.Any, ...]]], list[Giraffe]], rows: list[tuple[t.Any, ...]]) -> None:
+    start = time.perf_counter()
+    hydrate(rows)
+    duration = time.perf_counter() - start
+
+    tracemalloc.start()
+    instances = hydrate(rows)
+    memory, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    del instances
+    print(f"{name:<10} {len(rows) / duration:12.0f} rows/s {memory / len(rows):8.1f} bytes/instance")
+
+
+def main() -> None:
+    with tempfile.TemporaryDirectory() as directory:
+        _setup(os.path.join(directory, "benchmark.sqlite3"))
+
+        start = time.perf_counter()
+        Giraffe.query.all()
+        print(f"{'query':<10} {ROWS / (time.perf_counter() - start):12.0f} rows/s (fetch and hydrate)")
+
+        rows = Giraffe.query.with_fields(Giraffe.primary_key, Giraffe.number, Giraffe.date).all()
+        names = Giraffe._get_column_names()
+
+        _bench("hydrator", Giraffe._from_rows, rows)
+        _bench("__init__", lambda rows: [Giraffe(**dict(zip(names, row))) for row in rows], rows)
+
+        set_database(Database())
+
+
+if __name__ == "__main__":
+    main()
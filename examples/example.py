@@ -9,6 +9,8 @@
 
 from giraffe_orm.defaults import Migration
 
+from datetime import datetime, timedelta
+
 from .models import Giraffe
 
 
@@ -19,7 +21,7 @@ if giraffe:
     giraffe.primary_key.capitalize()
 
     giraffe.primary_key = "amazing"
-    giraffe.date = "tomorrow"
+    giraffe.date = datetime.now() + timedelta(days=1)
     giraffe.save()
 
 else:
@@ -6,9 +6,10 @@ def main():
     parser = argparse.ArgumentParser(prog="giraffe_orm")
     subparsers = parser.add_subparsers(dest="command", required=True)
 
-    commands = ["migrate", "upgrade"]
-    for name in commands:
-        mod = importlib.import_module(f"giraffe_orm.commands.{name}")
+    # Command names and their modules (import is a keyword)
+    commands = {"migrate": "migrate", "upgrade": "upgrade", "export": "export", "import": "import_"}
+    for name, module in commands.items():
+        mod = importlib.import_module(f"giraffe_orm.commands.{module}")
         subparser = subparsers.add_parser(name)
         mod.add_arguments(subparser)
         subparser.set_defaults(execute=mod.execute)
@@ -0,0 +1,147 @@
+from collections import OrderedDict
+
+import typing as t
+import threading
+import time
+import re
+
+
+DEFAULT_MAX_ENTRIES = 1024
+DEFAULT_TTL = 60.0
+
+
+# Table written by a statement, statements which are not recognised (e.g.
+# CREATE INDEX or those starting with WITH) invalidate every cached result.
+_WRITTEN_TABLE = re.compile(
+    r"""^\s*(?:
+        INSERT(?:\s+OR\s+\w+)?\s+INTO | REPLACE\s+INTO | UPDATE(?:\s+OR\s+\w+)? |
+        DELETE\s+FROM | ALTER\s+TABLE | DROP\s+TABLE(?:\s+IF\s+EXISTS)? |
+        CREATE\s+TABLE(?:\s+IF\s+NOT\s+EXISTS)?
+    )\s+["`\[]?(\w+)""",
+    re.IGNORECASE | re.VERBOSE
+)
+
+
+def written_table(query: str) -> str | None:
+    """
+    Returns the (lowercase) name of the table a write statement changes, or
+    None when it is unknown.
+    """
+    match = _WRITTEN_TABLE.match(query)
+    if not match: return None
+
+    return match.group(1).lower()
+
+
+class _Entry(t.NamedTuple):
+    expires_at: float
+    tables: tuple[str, ...]
+    value: t.Any
+
+
+class ResultCache:
+    """
+    Bounded LRU cache of query results (raw rows) keyed by the SQL and its
+    parameters. Entries expire after their ttl and are dropped whenever one
+    of their tables is written through the Database.
+    """
+
+    def __init__(self, max_entries: int = DEFAULT_MAX_ENTRIES) -> None:
+        self.max_entries = max_entries
+
+        self._entries: OrderedDict[t.Hashable, _Entry] = OrderedDict()
+        self._by_table: dict[str, set[t.Hashable]] = {}
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+    def get(self, key: t.Hashable) -> tuple[bool, t.Any]:
+        """
+        Returns whether key is cached, and its value.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+
+            if entry is None or entry.expires_at < time.monotonic():
+                if entry is not None: self._remove(key)
+
+                self.misses += 1
+                return False, None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+
+            return True, entry.value
+
+
+    def set(self, key: t.Hashable, tables: tuple[str, ...], value: t.Any, ttl: float) -> None:
+        with self._lock:
+            if key in self._entries: self._remove(key)
+
+            self._entries[key] = _Entry(time.monotonic() + ttl, tables, value)
+
+            for table in tables:
+                self._by_table.setdefault(table, set()).add(key)
+
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+
+    def invalidate(self, table: str | None = None) -> None:
+        """
+        Drops all results read from table, or every result when table is
+        None.
+        """
+        if not self._entries: return
+
+        with self._lock:
+            if table is None:
+                self.invalidations += len(self._entries)
+
+                self._entries.clear()
+                self._by_table.clear()
+                return
+
+            for key in self._by_table.pop(table, ()):
+                if key not in self._entries: continue
+
+                self._remove(key)
+                self.invalidations += 1
+
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._by_table.clear()
+
+            self.hits = 0
+            self.misses = 0
+            self.evictions = 0
+            self.invalidations = 0
+
+
+    def info(self) -> dict[str, int]:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+            "size": len(self._entries),
+        }
+
+
+    def _remove(self, key: t.Hashable) -> None:
+        entry = self._entries.pop(key)
+
+        for table in entry.tables:
+            keys = self._by_table.get(table)
+            if keys is not None: keys.discard(key)
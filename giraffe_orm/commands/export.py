@@ -0,0 +1,82 @@
+from giraffe_orm.commands.migrate import get_model
+from giraffe_orm.connections import query_chunks, DEFAULT_CHUNK_SIZE
+from giraffe_orm.converters import adapt, row_converter
+from giraffe_orm.models import Model
+
+import typing as t
+import argparse
+import time
+import json
+import csv
+import sys
+
+
+def add_arguments(parser: argparse.ArgumentParser):
+    parser.add_argument("model", help="The model (class or table name) to export.")
+    parser.add_argument("--format", choices=["csv", "ndjson"], default="csv", help="The output format.")
+    parser.add_argument("--output", "-o", help="The file to write to, standard output by default.")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE, help="The number of rows fetched at once.")
+
+    return
+
+
+def execute(args: argparse.Namespace):
+    model = get_model(args.model)
+    names = model._get_column_names()
+
+    # CSV holds every value as stored, NDJSON decodes JSON and BOOLEAN 
+    # columns to their JSON values
+    convert = _get_converter(model, converted=() if args.format == "csv" else ("JSON", "BOOLEAN"))
+
+    # Rows are fetched and written a chunk at a time, memory usage does not
+    # grow with the size of the table
+    chunks = query_chunks(f"SELECT {', '.join(names)} FROM {model._cls_tablename()}", (), model, args.chunk_size)
+    if convert is not None: chunks = ([convert(row) for row in chunk] for chunk in chunks)
+    file = open(args.output, "w", newline="", encoding="utf-8") if args.output else sys.stdout
+
+    start = time.perf_counter()
+
+    try:
+        rows = _write_csv(file, names, chunks) if args.format == "csv" else _write_ndjson(file, names, chunks)
+
+    finally:
+        if file is not sys.stdout: file.close()
+
+    duration = time.perf_counter() - start
+
+    # Reported on stderr, so it is not mixed into an export on stdout
+    print(f"Exported {rows} rows in {duration:.2f}s ({rows / duration if duration else 0:.0f} rows/s).", file=sys.stderr)
+
+
+def _get_converter(model: t.Type[Model], converted: tuple[str, ...]) -> t.Callable[[tuple[t.Any, ...]], tuple[t.Any, ...]] | None:
+    """
+    Converts the columns of model declared with one of the types of 
+    converted (e.g. JSON), the other columns are exported as stored.
+    """
+    types = [field.type if field.type.split("(")[0].split(" ")[0].upper() in converted else None for field in model._fields]
+    return row_converter(types)
+
+
+def _write_csv(file: t.TextIO, names: tuple[str, ...], chunks: t.Iterable[list[tuple[t.Any, ...]]]) -> int:
+    # Every value is quoted, so an empty string is distinct from NULL
+    writer = csv.writer(file, quoting=csv.QUOTE_NOTNULL)
+    writer.writerow(names)
+
+    rows = 0
+
+    # NULL becomes an unquoted empty cell
+    for chunk in chunks:
+        writer.writerows(chunk)
+        rows += len(chunk)
+
+    return rows
+
+
+def _write_ndjson(file: t.TextIO, names: tuple[str, ...], chunks: t.Iterable[list[tuple[t.Any, ...]]]) -> int:
+    rows = 0
+
+    for chunk in chunks:
+        file.writelines(json.dumps(dict(zip(names, row)), default=adapt) + "\n" for row in chunk)
+        rows += len(chunk)
+
+    return rows
@@ -0,0 +1,173 @@
+from giraffe_orm.commands.migrate import get_model
+from giraffe_orm.connections import change_many
+from giraffe_orm.fields import String, Json
+from giraffe_orm.models import Model
+
+from pathlib import Path
+
+import typing as t
+import itertools
+import argparse
+import time
+import json
+import csv
+import sys
+
+
+DEFAULT_IMPORT_BATCH_SIZE = 10_000
+
+# Readers only return None for unquoted empty cells (see QUOTE_NOTNULL) 
+# from Python 3.13 onwards
+READS_NULL = sys.version_info >= (3, 13)
+
+
+def add_arguments(parser: argparse.ArgumentParser):
+    parser.add_argument("model", help="The model (class or table name) to import into.")
+    parser.add_argument("file", help="The CSV or NDJSON file to import.")
+    parser.add_argument("--format", choices=["csv", "ndjson"], help="The input format, by default based on the file extension.")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_IMPORT_BATCH_SIZE, help="The number of rows inserted per transaction.")
+
+    return
+
+
+def execute(args: argparse.Namespace):
+    model = get_model(args.model)
+    path = Path(args.file)
+    input_format = args.format or ("csv" if path.suffix.lower() == ".csv" else "ndjson")
+
+    if args.batch_size < 1:
+        raise SystemExit(f"Invalid batch size {args.batch_size}, must be at least 1.")
+
+    start = time.perf_counter()
+    rows = 0
+
+    with open(path, newline="", encoding="utf-8") as file:
+        records = _read_csv(model, file) if input_format == "csv" else _read_ndjson(model, file)
+
+        # Every batch is parsed, then inserted with executemany (per set of 
+        # columns) in a transaction of its own
+        while batch := list(itertools.islice(records, args.batch_size)):
+            groups: dict[tuple[str, ...], list[tuple[t.Any, ...]]] = {}
+
+            for columns, values in batch:
+                groups.setdefault(columns, []).append(values)
+
+            change_many(((model.query._insert_statement(columns), values) for columns, values in groups.items()), model)
+            rows += len(batch)
+
+    duration = time.perf_counter() - start
+
+    print(f"Imported {rows} rows in {duration:.2f}s ({rows / duration if duration else 0:.0f} rows/s).")
+
+
+def _get_parsers(model: t.Type[Model], names: t.Iterable[str], json_values: bool = False) -> list[t.Callable[[t.Any], t.Any] | None]:
+    """
+    The Field.parse of every column, None for columns whose values are kept:
+    String fields, and Json fields whose CSV cells are the stored JSON text.
+    JSON values are encoded again for Json fields, only text is parsed for 
+    the other fields.
+    """
+    fields = {field.name: field for field in model._fields}
+    parsers: list[t.Callable[[t.Any], t.Any] | None] = []
+
+    for name in names:
+        field = fields.get(name)
+        if field is None: raise SystemExit(f"Unknown field {name} for {model.__name__}.")
+
+        if isinstance(field, String): parsers.append(None)
+        elif isinstance(field, Json): parsers.append(field._to_db if json_values else None)
+        else: parsers.append(_parse_text(field.parse) if json_values else field.parse)
+
+    return parsers
+
+
+def _parse_text(parse: t.Callable[[str], t.Any]) -> t.Callable[[t.Any], t.Any]:
+    def parse_text(value: t.Any) -> t.Any:
+        return parse(value) if isinstance(value, str) else value
+
+    return parse_text
+
+
+def _read_csv(model: t.Type[Model], file: t.TextIO) -> t.Iterator[tuple[tuple[str, ...], tuple[t.Any, ...]]]:
+    """
+    Yields the columns and typed values of every row, an unquoted empty cell
+    is NULL and a quoted one an empty string.
+    """
+    # The lines of the current record, the reader reads no further ahead
+    lines: list[str] = []
+
+    def read_lines() -> t.Iterator[str]:
+        for line in file:
+            lines.append(line)
+            yield line
+
+    reader = csv.reader(read_lines(), quoting=csv.QUOTE_NOTNULL)
+    names = next(reader, None)
+    if names is None: return
+
+    lines.clear()
+
+    columns = tuple(names)
+    parsers = _get_parsers(model, columns)
+
+    # With QUOTE_NOTNULL an unquoted empty cell is read as None
+    for row in t.cast(t.Iterator[list[str | None]], reader):
+        if not READS_NULL and "" in row:
+            row = [None if null else value for value, null in zip(row, _null_cells("".join(lines)))]
+
+        lines.clear()
+
+        yield columns, tuple(
+            (parse(value) if parse else value) if value is not None else None
+            for parse, value in zip(parsers, row)
+        )
+
+
+def _null_cells(record: str) -> list[bool]:
+    """
+    Whether every cell of the text of a CSV record is unquoted and empty, 
+    which readers before Python 3.13 return as an empty string.
+    """
+    nulls: list[bool] = []
+    end = len(record.rstrip("\r\n"))
+    i = 0
+
+    while True:
+        if record.startswith('"', i):
+            # A quote within a quoted cell is doubled
+            i = record.index('"', i + 1) + 1
+            while record.startswith('"', i): i = record.index('"', i + 1) + 1
+
+            nulls.append(False)
+
+        else:
+            start = i
+            i = record.find(",", i, end)
+            if i == -1: i = end
+
+            nulls.append(i == start)
+
+        if i >= end: return nulls
+        i += 1
+
+
+def _read_ndjson(model: t.Type[Model], file: t.TextIO) -> t.Iterator[tuple[tuple[str, ...], tuple[t.Any, ...]]]:
+    """
+    Yields the columns and typed values of every line. Text is parsed for 
+    fields which store another type (e.g. a Date).
+    """
+    parsers: dict[tuple[str, ...], list[t.Callable[[t.Any], t.Any] | None]] = {}
+
+    for line in file:
+        if not line.strip(): continue
+
+        record: dict[str, t.Any] = json.loads(line)
+        columns = tuple(record)
+
+        if columns not in parsers:
+            parsers[columns] = _get_parsers(model, columns, json_values=True)
+
+        yield columns, tuple(
+            parse(value) if parse and value is not None else value
+            for parse, value in zip(parsers[columns], record.values())
+        )
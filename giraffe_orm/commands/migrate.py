@@ -71,9 +71,19 @@ def _get_models() -> list[t.Type[Model]]:
     for module_path in config["models"]:
         importlib.import_module(module_path)
 
-    models = Model._registry
-    print(models)
-    return models
+    return Model._registry
+
+
+def get_model(name: str) -> t.Type[Model]:
+    """
+    Get the model class object by its class name or table name.
+    """
+
+    for model in _get_models():
+        if name in (model.__name__, model._cls_tablename()):
+            return model
+
+    raise SystemExit(f"Model {name} not found.")
 
 
 def _get_version() -> Migration | None:
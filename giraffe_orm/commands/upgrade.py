@@ -1,7 +1,7 @@
 
 from giraffe_orm.connections import execute_script
 from giraffe_orm.defaults import Migration
-from giraffe_orm.schemas import Schema, FieldSchema, RawFieldSchema, RenameFieldSchema
+from giraffe_orm.schemas import Schema, FieldSchema, RawFieldSchema, RenameFieldSchema, IndexSchema
 
 from pathlib import Path
 
@@ -51,6 +51,11 @@ def _get_migration_steps(migration: list[Schema]) -> str:
     migration_steps: str = ""
 
     for schema in migration:
+        # Indexes are dropped before altering, SQLite cannot drop indexed
+        # columns. Migrations of older versions have no index keys.
+        for name in schema.get("drop_indexes", []):
+            migration_steps += f"DROP INDEX IF EXISTS {name};"
+
         if "create" in schema and schema["create"]:
             create_fields = ", ".join(_get_field(field) for field in schema["create"])
             migration_steps += f"CREATE TABLE IF NOT EXISTS {schema["tablename"]} ({create_fields});"
@@ -59,6 +64,9 @@ def _get_migration_steps(migration: list[Schema]) -> str:
             alter_statements = _get_alter_statements(schema["tablename"], schema["alter"])
             migration_steps += alter_statements
 
+        for index in schema.get("indexes", []):
+            migration_steps += _get_index(schema["tablename"], index)
+
     return migration_steps
 
 
@@ -87,5 +95,17 @@ def _get_alter_statements(tablename: str, alterations: list[RawFieldSchema]) ->
     return alter_statements
 
 
+def _get_index(tablename: str, index: IndexSchema) -> str:
+    unique = "UNIQUE " if index["unique"] else ""
+    where = f" WHERE {index['where']}" if index["where"] else ""
+
+    return f"CREATE {unique}INDEX IF NOT EXISTS {index['name']} ON {tablename} ({', '.join(index['columns'])}){where};"
+
+
 def _get_field(field: FieldSchema):
-    return f"{field["name"]} {field["type"]}{" NOT NULL" if field["notnull"] else ""}{" PRIMARY KEY" if field["pk"] else ""}{" AUTOINCREMENT" if field["pk"] and not field["dflt_value"] and field["type"] == "INTEGER" else ""}{" DEFAULT " + str(field["dflt_value"]) if field["dflt_value"] else ""}"
+    definition = f"{field["name"]} {field["type"]}{" NOT NULL" if field["notnull"] else ""}{" PRIMARY KEY" if field["pk"] else ""}{" AUTOINCREMENT" if field["pk"] and not field["dflt_value"] and field["type"] == "INTEGER" else ""}{" DEFAULT " + str(field["dflt_value"]) if field["dflt_value"] else ""}"
+
+    if "references" in field:
+        definition += f" REFERENCES {field['references']} ON DELETE {field.get('on_delete', 'CASCADE')}"
+
+    return definition
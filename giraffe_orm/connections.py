@@ -1,60 +1,525 @@
+from giraffe_orm.transactions import Transaction, PinnedConnection
+from giraffe_orm.caching import ResultCache, written_table
+from giraffe_orm.plans import PlanStep
+from giraffe_orm.converters import adapt_parameters
+from giraffe_orm import events
+
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
 import typing as t
+import threading
+import asyncio
 import sqlite3
+import contextvars
+import queue
+
+
+if t.TYPE_CHECKING:
+    from .models import Model
+
+
+R = t.TypeVar("R")
+
+
+DEFAULT_PATH = "db.sqlite3"
+DEFAULT_POOL_SIZE = 5
+DEFAULT_CHUNK_SIZE = 500
+
+# INSERT ... RETURNING is available from SQLite 3.35 onwards
+SUPPORTS_RETURNING = sqlite3.sqlite_version_info >= (3, 35, 0)
+
+
+class Database:
+    """
+    Owns a bounded pool of SQLite connections. Connections are opened lazily
+    (up to `pool_size`) and are checked out for the duration of a single
+    statement (or transaction), so every thread gets its own connection 
+    instead of sharing one global cursor.
+
+    With `wal=True` the database file is switched to WAL journal mode, in 
+    which readers and writers do not block each other: rows can be saved 
+    while a streaming iteration (see `Query.iter()`) is still reading. The 
+    mode is stored in the database file (next to `-wal` and `-shm` files) 
+    and requires a local file system.
+    """
+
+    def __init__(self, path: str = DEFAULT_PATH, pool_size: int = DEFAULT_POOL_SIZE, timeout: float | None = None, wal: bool = False) -> None:
+        if pool_size < 1: raise ValueError(f"Invalid pool_size {pool_size}, must be at least 1")
+
+        self.path = path
+        self.pool_size = pool_size
+        self.timeout = timeout
+        self.wal = wal
+
+        self._pool: queue.LifoQueue[sqlite3.Connection] = queue.LifoQueue(maxsize=pool_size)
+        self._opened = 0
+        self._lock = threading.Lock()
+        self._executor: ThreadPoolExecutor | None = None
+
+        # The transaction of the current thread or asyncio task, if any
+        self._pin: contextvars.ContextVar[PinnedConnection | None] = contextvars.ContextVar(f"giraffe_orm_transaction_{id(self)}", default=None)
+
+        # The thread holding every checked out connection
+        self._owners: dict[int, int] = {}
+
+        self.result_cache = ResultCache()
+
+
+    def _connect(self) -> sqlite3.Connection:
+        # Connections may be handed to a different thread on every checkout,
+        # the pool guarantees that only one thread uses a connection at once.
+        # Transactions are controlled explicitly (see `transaction()`), any
+        # statement outside of one commits on its own.
+        # Values are adapted when bound and converted when loaded by the ORM
+        # itself (see the converters module), not by sqlite3.
+        conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+
+        # ForeignKey constraints (and their ON DELETE actions) are only 
+        # enforced when enabled per connection
+        conn.execute("PRAGMA foreign_keys = ON")
+
+        if self.wal: conn.execute("PRAGMA journal_mode = WAL")
+
+        return conn
+
+
+    def _checkout(self) -> sqlite3.Connection:
+        conn = self._get_connection()
+        self._owners[id(conn)] = threading.get_ident()
+
+        return conn
+
+
+    def _get_connection(self) -> sqlite3.Connection:
+        try:
+            return self._pool.get_nowait()
+
+        except queue.Empty:
+            pass
+
+        with self._lock:
+            if self._opened < self.pool_size:
+                self._opened += 1
+                open_new = True
+
+            else:
+                open_new = False
+
+        if not open_new:
+            # Waiting for a connection held by the waiting thread itself (e.g.
+            # by an unfinished `for ... in query` loop) would never end
+            if self._owned_by_current_thread():
+                raise RuntimeError(f"All {self.pool_size} connections are checked out by this thread, finish (or close) its iterations first or use a larger pool_size")
+
+            try:
+                return self._pool.get(timeout=self.timeout)
+
+            except queue.Empty:
+                raise TimeoutError(f"No connection available within {self.timeout} seconds")
+
+        try:
+            return self._connect()
+
+        except:
+            with self._lock:
+                self._opened -= 1
+
+            raise
+
+
+    def _checkin(self, conn: sqlite3.Connection) -> None:
+        self._owners.pop(id(conn), None)
+        self._pool.put_nowait(conn)
+
+
+    def _owned_by_current_thread(self) -> bool:
+        """
+        Whether every connection of the pool is checked out by this thread.
+        """
+        owners = list(self._owners.values())
+        ident = threading.get_ident()
+
+        return len(owners) >= self.pool_size and all(owner == ident for owner in owners)
+
+
+    def _pinned(self) -> sqlite3.Connection | None:
+        pinned = self._pin.get()
+        return pinned.conn if pinned else None
+
+
+    def _invalidate(self, query: str) -> None:
+        """
+        Drops the cached results of the table written by query. Within a 
+        transaction they are dropped again once it ends, other connections
+        may have cached the old rows in the meantime.
+        """
+        pinned = self._pin.get()
+        if pinned is None and not self.result_cache: return
+
+        table = written_table(query)
+        self.result_cache.invalidate(table)
+
+        if pinned is not None: pinned.written.add(table)
+
+
+    def transaction(self, immediate: bool = False) -> Transaction:
+        """
+        Returns a transaction context for this Database, see `Transaction`.
+        Transactions are bound to the thread or asyncio task which enters 
+        them.
+        """
+        return Transaction(self, immediate)
+
+
+    @contextmanager
+    def connection(self) -> t.Generator[sqlite3.Connection, None, None]:
+        """
+        Checks out a connection from the pool for the duration of the block,
+        or uses the connection of the transaction of the current thread (or
+        asyncio task).
+        """
+        pinned = self._pinned()
+
+        if pinned is not None:
+            yield pinned
+            return
+
+        conn = self._checkout()
+
+        try:
+            yield conn
+
+        finally:
+            self._checkin(conn)
+
+
+    def executor(self) -> ThreadPoolExecutor:
+        """
+        The worker threads used by the async API. There is one worker per 
+        pooled connection, so every in-flight coroutine holds a connection.
+        """
+        if self._executor: return self._executor
+
+        with self._lock:
+            if not self._executor:
+                self._executor = ThreadPoolExecutor(max_workers=self.pool_size, thread_name_prefix="giraffe_orm")
+
+        return self._executor
+
+
+    async def run_async(self, func: t.Callable[..., R], *args: t.Any) -> R:
+        """
+        Runs a blocking database call on the worker threads of this Database
+        without blocking the running event loop. Within a transaction the call
+        runs on its connection.
+        """
+        loop = asyncio.get_running_loop()
+
+        # Carry the caller's context over so scoped listeners (such as the
+        # N+1 detector) and the caller's transaction also apply to 
+        # statements executed on the worker threads.
+        context = contextvars.copy_context()
+        pinned = self._pin.get()
+
+        def run() -> R:
+            if pinned is None: return context.run(func, *args)
+
+            with pinned.lock:
+                return context.run(func, *args)
+
+        return await loop.run_in_executor(self.executor(), run)
+
+
+    def close(self) -> None:
+        """
+        Closes all idle connections of this pool and stops its async workers.
+        """
+        if self._executor:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+        while True:
+            try:
+                conn = self._pool.get_nowait()
+
+            except queue.Empty:
+                break
+
+            conn.close()
+
+            with self._lock:
+                self._opened -= 1
+
+
+    def change_db(self, query: str, parameters: tuple[t.Any, ...], model: 't.Type[Model] | None' = None) -> int:
+        with self.connection() as conn:
+            event = events.before_execute(query, parameters, model, conn) if events.active else None
 
-conn = sqlite3.connect('db.sqlite3')
-cursor = conn.cursor()
+            cursor = conn.execute(query, adapt_parameters(parameters))
+            self._invalidate(query)
 
+            if event: events.after_execute(event, cursor.rowcount)
 
-def change_db(query: str, parameters: tuple[t.Any, ...]) -> int:
-    print('\tchange_query: ', query)
+            if query.lower().lstrip().startswith("insert"):
+                last_row_id = cursor.lastrowid
 
-    cursor.execute(query, parameters)
-    conn.commit()
-    
-    if query.lower().startswith("insert"):
-        last_row_id = cursor.lastrowid
+                return last_row_id if last_row_id else 0
 
-        return last_row_id if last_row_id else 0
+        # The number of changed rows for any other statement
+        return max(cursor.rowcount, 0)
 
-    return 0
 
+    def query_all(self, query: str, parameters: tuple[t.Any, ...] | None = None, model: 't.Type[Model] | None' = None) -> list[tuple[t.Any, ...]]:
+        with self.connection() as conn:
+            event = events.before_execute(query, parameters, model, conn) if events.active else None
 
-def query_all(query: str) -> list[tuple[t.Any, ...]]:
-    print('\tall_query: ', query)
+            rows = conn.execute(query, adapt_parameters(parameters or ())).fetchall()
 
-    cursor.execute(query)
-    rows = cursor.fetchall()
+            if event: events.after_execute(event, len(rows))
 
-    print('\tall_query_result: ', rows)
+        return rows
 
-    return rows
 
+    def query_chunks(self, query: str, parameters: tuple[t.Any, ...] | None = None, model: 't.Type[Model] | None' = None, chunk_size: int = DEFAULT_CHUNK_SIZE) -> t.Iterator[list[tuple[t.Any, ...]]]:
+        """
+        Yields the rows of the query in chunks of at most `chunk_size` rows, 
+        using `fetchmany`. The connection stays checked out until the 
+        generator is exhausted or closed, statements executed meanwhile use
+        another connection of the pool.
+        """
+        if chunk_size < 1: raise ValueError(f"Invalid chunk_size {chunk_size}, must be at least 1")
 
-def query_one(query: str, parameters: tuple[t.Any, ...] | None = None) -> tuple[t.Any, ...]:
-    print('\tone_query: ', query)
+        with self.connection() as conn:
+            event = events.before_execute(query, parameters, model, conn) if events.active else None
 
-    if parameters:
-        cursor.execute(query, parameters)
+            cursor = conn.execute(query, adapt_parameters(parameters or ()))
+            row_count = 0
 
-    else:
-        cursor.execute(query)
-    
-    row = cursor.fetchone()
+            try:
+                while True:
+                    rows = cursor.fetchmany(chunk_size)
+                    if not rows: break
 
-    print('\tone_query_result: ', row)
+                    row_count += len(rows)
+                    yield rows
 
-    return row
+            finally:
+                cursor.close()
+
+            if event: events.after_execute(event, row_count)
+
+
+    def query_one(self, query: str, parameters: tuple[t.Any, ...] | None = None, model: 't.Type[Model] | None' = None) -> tuple[t.Any, ...]:
+        with self.connection() as conn:
+            event = events.before_execute(query, parameters, model, conn) if events.active else None
+
+            row = conn.execute(query, adapt_parameters(parameters or ())).fetchone()
+
+            if event: events.after_execute(event, 1 if row else 0)
+
+        return row
+
+
+    def explain(self, query: str, parameters: tuple[t.Any, ...] | None = None, connection: sqlite3.Connection | None = None) -> list[PlanStep]:
+        """
+        Returns the `EXPLAIN QUERY PLAN` of query, on connection (e.g. the one
+        of an ExecuteEvent) or a pooled connection. The statement itself is 
+        not executed and not reported to event listeners.
+        """
+        if connection is not None: return _explain(connection, query, parameters)
+
+        with self.connection() as conn:
+            return _explain(conn, query, parameters)
+
+
+    def get_column_names(self, query: str) -> list[str]:
+        with self.connection() as conn:
+            cursor = conn.execute(query)
+            return [description[0] for description in cursor.description]
+
+
+    def change_many(self, statements: t.Iterable[tuple[str, t.Iterable[tuple[t.Any, ...]]]], model: 't.Type[Model] | None' = None) -> int:
+        """
+        Runs `executemany` for every (query, rows) statement within a single
+        transaction (a savepoint when already inside one). Returns the number
+        of changed rows.
+        """
+        row_count = 0
+
+        with self.transaction() as conn:
+            for query, rows in statements:
+                event = events.before_execute(query, rows, model, conn, many=True) if events.active else None
+
+                cursor = conn.executemany(query, map(adapt_parameters, rows))
+                row_count += cursor.rowcount
+
+                self._invalidate(query)
+
+                if event: events.after_execute(event, cursor.rowcount)
+
+        return row_count
+
+
+    def insert_many(self, statements: t.Iterable[tuple[str, tuple[t.Any, ...]]], model: 't.Type[Model] | None' = None) -> list[t.Any]:
+        """
+        Executes every (query, parameters) INSERT statement within a single
+        transaction (a savepoint when already inside one). Returns the rows 
+        returned by every statement (INSERT ... RETURNING, possibly of many
+        rows), or else the row id of every statement.
+        """
+        results: list[t.Any] = []
+        queries: set[str] = set()
+
+        with self.transaction() as conn:
+            for query, parameters in statements:
+                event = events.before_execute(query, parameters, model, conn) if events.active else None
+
+                cursor = conn.execute(query, adapt_parameters(parameters))
+                queries.add(query)
+
+                if cursor.description is not None:
+                    rows = cursor.fetchall()
+                    results.extend(rows)
+
+                    if event: events.after_execute(event, len(rows))
+                    continue
+
+                results.append(cursor.lastrowid or 0)
+
+                if event: events.after_execute(event, 1)
+
+            for query in queries:
+                self._invalidate(query)
+
+        return results
+
+
+    def change_returning(self, query: str, parameters: tuple[t.Any, ...], model: 't.Type[Model] | None' = None) -> list[tuple[t.Any, ...]]:
+        """
+        Executes a write statement with a RETURNING clause and returns the 
+        returned rows.
+        """
+        with self.connection() as conn:
+            event = events.before_execute(query, parameters, model, conn) if events.active else None
+
+            rows = conn.execute(query, adapt_parameters(parameters)).fetchall()
+            self._invalidate(query)
+
+            if event: events.after_execute(event, len(rows))
+
+        return rows
+
+
+    def execute_script(self, script: str) -> None:
+        """
+        Executes all statements of the script within a single transaction 
+        (a savepoint when already inside one). Unlike `executescript` this 
+        never commits a surrounding transaction.
+        """
+        with self.transaction() as conn:
+            event = events.before_execute(script, (), None, conn) if events.active else None
+
+            for statement in _split_script(script):
+                conn.execute(statement)
+                self._invalidate(statement)
+
+            if event: events.after_execute(event, -1)
+
+        return None
+
+
+def _explain(conn: sqlite3.Connection, query: str, parameters: tuple[t.Any, ...] | None) -> list[PlanStep]:
+    # EXPLAIN does not check for schema changes (e.g. a new index) by other
+    # connections. Reading the schema reloads it, and with the schema version
+    # in its SQL the statement cached by sqlite3 is prepared again as well.
+    conn.execute("SELECT COUNT(*) FROM sqlite_master").fetchone()
+    version = conn.execute("PRAGMA schema_version").fetchone()[0]
+    rows = conn.execute(f"EXPLAIN QUERY PLAN {query}\n-- schema {version}", adapt_parameters(parameters or ())).fetchall()
+
+    return [PlanStep(row[0], row[1], row[3]) for row in rows]
+
+
+def _split_script(script: str) -> list[str]:
+    """
+    Splits a script into its complete statements (semicolons inside string
+    literals or triggers do not end a statement).
+    """
+    statements: list[str] = []
+    current = ""
+
+    for part in script.split(";"):
+        current += part + ";"
+
+        if not sqlite3.complete_statement(current): continue
+        if current.strip(" \t\n;"): statements.append(current.strip())
+
+        current = ""
+
+    if current.strip(" \t\n;"): statements.append(current.strip())
+
+    return statements
+
+
+database = Database()
+
+
+def get_database() -> Database:
+    return database
+
+
+def set_database(db: Database) -> Database:
+    """
+    Replaces the default Database used by Query, Model and the commands. The
+    previous Database is closed and returned.
+    """
+    global database
+
+    previous, database = database, db
+    previous.close()
+
+    return previous
+
+
+def transaction(immediate: bool = False) -> Transaction:
+    return database.transaction(immediate)
+
+
+def change_db(query: str, parameters: tuple[t.Any, ...], model: 't.Type[Model] | None' = None) -> int:
+    return database.change_db(query, parameters, model)
+
+
+def query_all(query: str, parameters: tuple[t.Any, ...] | None = None, model: 't.Type[Model] | None' = None) -> list[tuple[t.Any, ...]]:
+    return database.query_all(query, parameters, model)
+
+
+def query_chunks(query: str, parameters: tuple[t.Any, ...] | None = None, model: 't.Type[Model] | None' = None, chunk_size: int = DEFAULT_CHUNK_SIZE) -> t.Iterator[list[tuple[t.Any, ...]]]:
+    return database.query_chunks(query, parameters, model, chunk_size)
+
+
+def query_one(query: str, parameters: tuple[t.Any, ...] | None = None, model: 't.Type[Model] | None' = None) -> tuple[t.Any, ...]:
+    return database.query_one(query, parameters, model)
+
+
+def explain(query: str, parameters: tuple[t.Any, ...] | None = None) -> list[PlanStep]:
+    return database.explain(query, parameters)
 
 
 def get_column_names(query: str) -> list[str]:
-    cursor.execute(query)
-    return [description[0] for description in cursor.description]
+    return database.get_column_names(query)
 
 
-def execute_script(script: str) -> None:
-    print('\tscript', script)
+def change_many(statements: t.Iterable[tuple[str, t.Iterable[tuple[t.Any, ...]]]], model: 't.Type[Model] | None' = None) -> int:
+    return database.change_many(statements, model)
+
 
-    cursor.executescript(script)
-    conn.commit()
+def insert_many(statements: t.Iterable[tuple[str, tuple[t.Any, ...]]], model: 't.Type[Model] | None' = None) -> list[t.Any]:
+    return database.insert_many(statements, model)
 
-    return None
+
+def change_returning(query: str, parameters: tuple[t.Any, ...], model: 't.Type[Model] | None' = None) -> list[tuple[t.Any, ...]]:
+    return database.change_returning(query, parameters, model)
+
+
+def execute_script(script: str) -> None:
+    return database.execute_script(script)
@@ -0,0 +1,111 @@
+from datetime import date, datetime
+from decimal import Decimal
+
+import typing as t
+import json
+
+
+# Nothing is registered with the sqlite3 module, which would change how every
+# connection of the process binds and decodes values. Parameters bound by the
+# ORM are adapted by their type (see `adapt_parameters()`), values of Json 
+# fields by the field (see `Field._to_db()`). The values of columns 
+# declared with one of the converted types (the first word of the declared
+# type, case insensitive) are converted when rows are loaded (see 
+# `row_converter()`). Values of expressions (e.g. aggregates) are returned as 
+# stored.
+
+
+def _adapt_datetime(value: datetime) -> str:
+    # The format of CURRENT_TIMESTAMP, so stored dates compare as text
+    return value.isoformat(" ")
+
+
+def _convert_date(value: t.Any) -> t.Any:
+    if not isinstance(value, str): return value
+
+    # Rows written before dates were adapted may hold any text
+    try:
+        return datetime.fromisoformat(value)
+
+    except ValueError:
+        return value
+
+
+def _convert_boolean(value: t.Any) -> bool:
+    return value not in (0, "0", "0.0")
+
+
+def _convert_json(value: t.Any) -> t.Any:
+    # Columns declared as JSON before it had TEXT affinity store numbers as 
+    # numbers
+    if not isinstance(value, str | bytes): return value
+
+    return json.loads(value)
+
+
+def _convert_decimal(value: t.Any) -> Decimal:
+    return Decimal(str(value))
+
+
+ADAPTERS: dict[type, t.Callable[[t.Any], t.Any]] = {
+    datetime: _adapt_datetime,
+    date: date.isoformat,
+    Decimal: str,
+}
+
+CONVERTERS: dict[str, t.Callable[[t.Any], t.Any]] = {
+    "DATE": _convert_date,
+    "BOOLEAN": _convert_boolean,
+    "JSON": _convert_json,
+    "DECIMAL": _convert_decimal,
+}
+
+
+def adapt(value: t.Any) -> t.Any:
+    """
+    Returns value as it is stored in the database.
+    """
+    adapter = ADAPTERS.get(value.__class__)
+    if adapter is None: return value
+
+    return adapter(value)
+
+
+def adapt_parameters(parameters: tuple[t.Any, ...]) -> tuple[t.Any, ...]:
+    """
+    Returns parameters with every value as it is stored in the database, 
+    parameters themselves when no value needs to be adapted.
+    """
+    for value in parameters:
+        if type(value) in ADAPTERS: return tuple(map(adapt, parameters))
+
+    return parameters
+
+
+def get_converter(type: str) -> t.Callable[[t.Any], t.Any] | None:
+    """
+    The converter of the values of columns declared with type, if any.
+    """
+    return CONVERTERS.get(type.split("(")[0].split(" ")[0].upper())
+
+
+def row_converter(types: t.Sequence[str | None]) -> t.Callable[[tuple[t.Any, ...]], tuple[t.Any, ...]] | None:
+    """
+    Builds the function which converts the values of a row whose columns are
+    declared with types (None for expressions). Returns None when no column 
+    has a converter, so rows can be used as fetched.
+    """
+    conversions = [(index, converter) for index, type in enumerate(types) if type and (converter := get_converter(type))]
+    if not conversions: return None
+
+    def convert(row: tuple[t.Any, ...]) -> tuple[t.Any, ...]:
+        values = list(row)
+
+        # NULL is never converted
+        for index, converter in conversions:
+            value = values[index]
+            if value is not None: values[index] = converter(value)
+
+        return tuple(values)
+
+    return convert
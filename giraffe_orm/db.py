@@ -1,3 +1,15 @@
+from .connections import Database, get_database, set_database, transaction
 from .transactions import Transaction
 from .models import Model
-from .fields import String, Integer, Float, Date
+from .fields import String, Integer, Float, Date, Boolean, Json, Decimal, ForeignKey
+from .indexes import Index
+from .expressions import and_, or_, not_
+from .sessions import Session
+from .identity import IdentityMap
+
+
+__all__ = [
+    "Database", "get_database", "set_database", "transaction", "Transaction", "Model",
+    "String", "Integer", "Float", "Date", "Boolean", "Json", "Decimal", "ForeignKey",
+    "Index", "and_", "or_", "not_", "Session", "IdentityMap",
+]
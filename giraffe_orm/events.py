@@ -0,0 +1,366 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+import typing as t
+import warnings
+import logging
+import sqlite3
+import time
+import sys
+import os
+import re
+
+
+if t.TYPE_CHECKING:
+    from .models import Model
+
+
+EventName = t.Literal["before_execute", "after_execute"]
+Listener = t.Callable[["ExecuteEvent"], None]
+
+
+logger = logging.getLogger("giraffe_orm")
+
+
+class ExecuteEvent:
+    """
+    Describes a single statement sent to the database. `duration` and
+    `row_count` are only known once the `after_execute` listeners are called.
+    Statements executed with `executemany` (`many`) have a sequence of rows
+    as parameters. `connection` executes the statement, listeners may use it
+    for statements of their own (the connection is not otherwise available
+    to them until the statement ends).
+    """
+
+    __slots__ = ("sql", "parameters", "model", "connection", "many", "started_at", "duration", "row_count")
+
+    def __init__(self, sql: str, parameters: t.Any, model: 't.Type[Model] | None', connection: sqlite3.Connection | None = None, many: bool = False) -> None:
+        self.sql = sql
+        self.parameters = parameters
+        self.model = model
+        self.connection = connection
+        self.many = many
+
+        self.started_at = 0.0
+        self.duration = 0.0
+        self.row_count = -1
+
+
+_listeners: dict[EventName, list[Listener]] = {
+    "before_execute": [],
+    "after_execute": [],
+}
+
+# Checked by the connection layer before building any event, so statements
+# cost a single attribute lookup while nobody is listening.
+active = False
+
+
+def listen(name: EventName, listener: Listener) -> Listener:
+    """
+    Registers a listener for the provided event. Returns the listener so it
+    can be used as a decorator.
+    """
+    global active
+
+    _listeners[name].append(listener)
+    active = True
+
+    return listener
+
+
+def remove(name: EventName, listener: Listener) -> None:
+    global active
+
+    _listeners[name].remove(listener)
+    active = any(_listeners.values())
+
+
+def before_execute(sql: str, parameters: t.Any, model: 't.Type[Model] | None', connection: sqlite3.Connection | None = None, many: bool = False) -> ExecuteEvent:
+    event = ExecuteEvent(sql, parameters, model, connection, many)
+
+    for listener in _listeners["before_execute"]:
+        listener(event)
+
+    event.started_at = time.perf_counter()
+    return event
+
+
+def after_execute(event: ExecuteEvent, row_count: int) -> None:
+    event.duration = time.perf_counter() - event.started_at
+    event.row_count = row_count
+
+    for listener in _listeners["after_execute"]:
+        listener(event)
+
+
+def log_execute(event: ExecuteEvent) -> None:
+    """
+    Listener which logs every statement on the `giraffe_orm` logger, a
+    replacement for printing all queries:
+
+        events.listen("after_execute", events.log_execute)
+    """
+    logger.debug("%s %r (%d rows, %.3f ms)", event.sql, event.parameters, event.row_count, event.duration * 1000)
+
+
+def _stacklevel() -> int:
+    """
+    The stacklevel of the first frame outside of giraffe_orm, for warnings 
+    issued by the caller to point at the code which ran the statement.
+    """
+    package = os.path.dirname(__file__) + os.sep
+    frame = sys._getframe(1)
+    level = 1
+
+    while frame.f_back is not None and frame.f_code.co_filename.startswith(package):
+        frame = frame.f_back
+        level += 1
+
+    return level
+
+
+_whitespace = re.compile(r"\s+")
+_literals = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+
+
+def statement_shape(sql: str) -> str:
+    """
+    Normalizes a statement so that statements which only differ in literal
+    values or whitespace share the same shape.
+    """
+    return _literals.sub("?", _whitespace.sub(" ", sql).strip())
+
+
+class StatementStat:
+    __slots__ = ("count", "total", "min", "max", "rows")
+
+    def __init__(self) -> None:
+        self.count = 0
+        self.total = 0.0
+        self.min = float("inf")
+        self.max = 0.0
+        self.rows = 0
+
+    @property
+    def mean(self) -> float:
+        return self.total / self.count if self.count else 0.0
+
+
+class StatementStats:
+    """
+    Collects the execution count and latencies per statement shape.
+
+        with StatementStats() as stats:
+            ...
+
+        for shape, stat in stats.report():
+            print(shape, stat.count, stat.mean)
+    """
+
+    def __init__(self) -> None:
+        self.statements: dict[str, StatementStat] = {}
+
+    def __enter__(self) -> t.Self:
+        self.install()
+        return self
+
+    def __exit__(self, *_: t.Any) -> None:
+        self.uninstall()
+
+    def install(self) -> None:
+        listen("after_execute", self._on_execute)
+
+    def uninstall(self) -> None:
+        remove("after_execute", self._on_execute)
+
+    def reset(self) -> None:
+        self.statements = {}
+
+    def report(self) -> list[tuple[str, StatementStat]]:
+        """
+        Returns all statement shapes, the most time consuming first.
+        """
+        return sorted(self.statements.items(), key=lambda item: item[1].total, reverse=True)
+
+    def _on_execute(self, event: ExecuteEvent) -> None:
+        shape = statement_shape(event.sql)
+        stat = self.statements.get(shape)
+
+        if stat is None:
+            stat = self.statements[shape] = StatementStat()
+
+        stat.count += 1
+        stat.total += event.duration
+        stat.rows += max(event.row_count, 0)
+
+        if event.duration < stat.min: stat.min = event.duration
+        if event.duration > stat.max: stat.max = event.duration
+
+
+class NPlusOneWarning(UserWarning):
+    pass
+
+
+class NPlusOneError(Exception):
+    pass
+
+
+class NPlusOneDetector:
+    """
+    Flags SELECT statements of the same shape which run `threshold` times or
+    more within one scope (e.g. a single request). Scopes are tracked per
+    context, so concurrent threads and coroutines are counted separately.
+
+        detector = NPlusOneDetector(threshold=10)
+        detector.install()
+
+        with detector.scope():
+            handle_request()
+    """
+
+    def __init__(self, threshold: int = 10, raise_error: bool = False) -> None:
+        if threshold < 2: raise ValueError(f"Invalid threshold {threshold}, must be at least 2")
+
+        self.threshold = threshold
+        self.raise_error = raise_error
+        self.flagged: dict[str, int] = {}
+
+        self._counts: ContextVar[dict[str, int] | None] = ContextVar(f"n_plus_one_{id(self)}", default=None)
+
+    def install(self) -> None:
+        listen("after_execute", self._on_execute)
+
+    def uninstall(self) -> None:
+        remove("after_execute", self._on_execute)
+
+    @contextmanager
+    def scope(self) -> t.Generator[dict[str, int], None, None]:
+        counts: dict[str, int] = {}
+        token = self._counts.set(counts)
+
+        try:
+            yield counts
+
+        finally:
+            self._counts.reset(token)
+
+    def _on_execute(self, event: ExecuteEvent) -> None:
+        counts = self._counts.get()
+        if counts is None: return
+        if not event.sql.lstrip()[:6].upper() == "SELECT": return
+
+        shape = statement_shape(event.sql)
+        count = counts[shape] = counts.get(shape, 0) + 1
+
+        if count != self.threshold: return
+
+        self.flagged[shape] = self.flagged.get(shape, 0) + 1
+        message = f"Statement executed {count} times in one scope{f' for {event.model.__name__}' if event.model else ''}: {shape}"
+
+        if self.raise_error:
+            raise NPlusOneError(message)
+
+        warnings.warn(message, NPlusOneWarning, stacklevel=_stacklevel())
+
+
+class FullScanWarning(UserWarning):
+    pass
+
+
+class FullScanError(Exception):
+    pass
+
+
+class ScanGuard:
+    """
+    Flags statements which scan every row of a table, or sort in a temporary
+    B-tree for ORDER BY, on tables with at least `min_rows` rows. Every
+    distinct statement is explained once, tables are counted once:
+
+        guard = ScanGuard(min_rows=10_000, raise_error=True)
+        guard.install()
+    """
+
+    def __init__(self, min_rows: int = 1000, raise_error: bool = False) -> None:
+        self.min_rows = min_rows
+        self.raise_error = raise_error
+        self.flagged: dict[str, int] = {}
+
+        self._problems: dict[str, str | None] = {}
+        self._row_counts: dict[str, int] = {}
+
+    def install(self) -> None:
+        listen("after_execute", self._on_execute)
+
+    def uninstall(self) -> None:
+        remove("after_execute", self._on_execute)
+
+    def reset(self) -> None:
+        self.flagged = {}
+        self._problems = {}
+        self._row_counts = {}
+
+    def _on_execute(self, event: ExecuteEvent) -> None:
+        if not event.sql.lstrip()[:6].upper() in ("SELECT", "UPDATE", "DELETE"): return
+
+        if event.sql not in self._problems:
+            self._problems[event.sql] = self._check(event)
+
+        problem = self._problems[event.sql]
+        if problem is None: return
+
+        shape = statement_shape(event.sql)
+        self.flagged[shape] = self.flagged.get(shape, 0) + 1
+
+        message = f"Statement {problem}{f' for {event.model.__name__}' if event.model else ''}: {shape}"
+
+        if self.raise_error:
+            raise FullScanError(message)
+
+        warnings.warn(message, FullScanWarning, stacklevel=_stacklevel())
+
+    def _check(self, event: ExecuteEvent) -> str | None:
+        from .connections import get_database
+
+        # Explained and counted on the connection of the statement, which is
+        # still checked out (another one may not be available). Statements 
+        # executed with executemany are explained with their first row.
+        conn = event.connection
+        parameters = event.parameters
+
+        if event.many:
+            parameters = next(iter(parameters), None)
+            if parameters is None: return None
+
+        plan = get_database().explain(event.sql, parameters, conn)
+        tables = [step.table for step in plan if step.table]
+
+        def row_count(table: str | None) -> int:
+            return self._row_count(conn, table)
+
+        for step in plan:
+            if step.is_full_scan and row_count(step.table) >= self.min_rows:
+                return f"scans all rows of {step.table}"
+
+            if step.sorts_in_temp_btree and max(map(row_count, tables), default=0) >= self.min_rows:
+                return "sorts in a temporary B-tree for ORDER BY"
+
+        return None
+
+    def _row_count(self, conn: sqlite3.Connection | None, table: str | None) -> int:
+        if table is None: return 0
+
+        if table not in self._row_counts:
+            from .connections import get_database
+
+            # Counted on the connection directly, so the count itself is not
+            # reported to listeners (and checked again)
+            if conn is not None:
+                self._row_counts[table] = conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+
+            else:
+                with get_database().connection() as conn:
+                    self._row_counts[table] = conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+
+        return self._row_counts[table]
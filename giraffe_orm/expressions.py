@@ -0,0 +1,348 @@
+from abc import ABC, abstractmethod
+
+import typing as t
+
+
+if t.TYPE_CHECKING:
+    from .fields import Field
+
+
+class Expression(ABC):
+    """
+    Base class of all SQL expressions built from Fields, such as
+    `Giraffe.number > 5`. An expression compiles to parameterized SQL; its
+    shape (the SQL without values) is hashable so compiled queries can be
+    cached.
+    """
+
+    __slots__ = ("_identity",)
+
+    def __init__(self) -> None:
+        # Only set for `==` and `!=` between Fields and other values, so that
+        # `field in fields` and friends keep working on plain Python objects.
+        self._identity: bool | None = None
+
+    @abstractmethod
+    def _compile(self) -> str:
+        ...
+
+    @abstractmethod
+    def _bind(self, parameters: list[t.Any]) -> None:
+        """
+        Appends the values of this expression to parameters, in the order of
+        the placeholders of `_compile()`.
+        """
+
+    @abstractmethod
+    def _shape(self) -> t.Hashable:
+        ...
+
+    def __bool__(self) -> bool:
+        if self._identity is None:
+            raise TypeError("Expressions cannot be used as booleans, combine them with &, | and ~")
+
+        return self._identity
+
+    def __and__(self, other: "Expression") -> "BooleanClause":
+        return and_(self, other)
+
+    def __or__(self, other: "Expression") -> "BooleanClause":
+        return or_(self, other)
+
+    def __invert__(self) -> "Not":
+        return Not(self)
+
+    def __add__(self, value: t.Any) -> "BinaryExpression":
+        return BinaryExpression(self, "+", operand(value))
+
+    def __sub__(self, value: t.Any) -> "BinaryExpression":
+        return BinaryExpression(self, "-", operand(value))
+
+    def __mul__(self, value: t.Any) -> "BinaryExpression":
+        return BinaryExpression(self, "*", operand(value))
+
+    def __truediv__(self, value: t.Any) -> "BinaryExpression":
+        return BinaryExpression(self, "/", operand(value))
+
+
+class Column(Expression):
+    __slots__ = ("field",)
+
+    def __init__(self, field: 'Field[t.Any]') -> None:
+        super().__init__()
+        self.field = field
+
+    def _compile(self) -> str:
+        return self.field.get_name()
+
+    def _bind(self, parameters: list[t.Any]) -> None:
+        return
+
+    def _shape(self) -> t.Hashable:
+        return ("column", self.field.get_name())
+
+
+class Value(Expression):
+    __slots__ = ("value",)
+
+    def __init__(self, value: t.Any) -> None:
+        super().__init__()
+        self.value = value
+
+    def _compile(self) -> str:
+        return "?"
+
+    def _bind(self, parameters: list[t.Any]) -> None:
+        parameters.append(self.value)
+
+    def _shape(self) -> t.Hashable:
+        return "?"
+
+
+class BinaryExpression(Expression):
+    """
+    Comparisons (`=`, `<`, `LIKE`, ...) and arithmetic (`+`, `-`, ...)
+    between two operands.
+    """
+
+    __slots__ = ("left", "operator", "right")
+
+    def __init__(self, left: Expression, operator: str, right: Expression) -> None:
+        super().__init__()
+
+        self.left = left
+        self.operator = operator
+        self.right = right
+
+    def _compile(self) -> str:
+        return f"{_group(self.left)} {self.operator} {_group(self.right)}"
+
+    def _bind(self, parameters: list[t.Any]) -> None:
+        self.left._bind(parameters)
+        self.right._bind(parameters)
+
+    def _shape(self) -> t.Hashable:
+        return (self.operator, self.left._shape(), self.right._shape())
+
+
+class In(Expression):
+    __slots__ = ("left", "values", "negate")
+
+    def __init__(self, left: Expression, values: t.Iterable[t.Any], negate: bool = False) -> None:
+        super().__init__()
+
+        self.left = left
+        self.values = tuple(values)
+        self.negate = negate
+
+    def _compile(self) -> str:
+        # An empty IN list is always false (and an empty NOT IN always true)
+        if not self.values: return "1" if self.negate else "0"
+
+        placeholders = ", ".join("?" for _ in self.values)
+        return f"{_group(self.left)} {'NOT IN' if self.negate else 'IN'} ({placeholders})"
+
+    def _bind(self, parameters: list[t.Any]) -> None:
+        if not self.values: return
+
+        self.left._bind(parameters)
+        parameters.extend(self.values)
+
+    def _shape(self) -> t.Hashable:
+        return ("in", self.negate, self.left._shape(), len(self.values))
+
+
+class IsNull(Expression):
+    __slots__ = ("left", "negate")
+
+    def __init__(self, left: Expression, negate: bool = False) -> None:
+        super().__init__()
+
+        self.left = left
+        self.negate = negate
+
+    def _compile(self) -> str:
+        return f"{_group(self.left)} {'IS NOT NULL' if self.negate else 'IS NULL'}"
+
+    def _bind(self, parameters: list[t.Any]) -> None:
+        self.left._bind(parameters)
+
+    def _shape(self) -> t.Hashable:
+        return ("null", self.negate, self.left._shape())
+
+
+class Between(Expression):
+    __slots__ = ("left", "low", "high")
+
+    def __init__(self, left: Expression, low: Expression, high: Expression) -> None:
+        super().__init__()
+
+        self.left = left
+        self.low = low
+        self.high = high
+
+    def _compile(self) -> str:
+        return f"{_group(self.left)} BETWEEN {_group(self.low)} AND {_group(self.high)}"
+
+    def _bind(self, parameters: list[t.Any]) -> None:
+        self.left._bind(parameters)
+        self.low._bind(parameters)
+        self.high._bind(parameters)
+
+    def _shape(self) -> t.Hashable:
+        return ("between", self.left._shape(), self.low._shape(), self.high._shape())
+
+
+class BooleanClause(Expression):
+    __slots__ = ("operator", "clauses")
+
+    def __init__(self, operator: t.Literal["AND", "OR"], clauses: tuple[Expression, ...]) -> None:
+        super().__init__()
+
+        self.operator = operator
+        self.clauses = clauses
+
+    def _compile(self) -> str:
+        return f" {self.operator} ".join(_group(clause) for clause in self.clauses)
+
+    def _bind(self, parameters: list[t.Any]) -> None:
+        for clause in self.clauses:
+            clause._bind(parameters)
+
+    def _shape(self) -> t.Hashable:
+        return (self.operator, tuple(clause._shape() for clause in self.clauses))
+
+
+class Not(Expression):
+    __slots__ = ("clause",)
+
+    def __init__(self, clause: Expression) -> None:
+        super().__init__()
+        self.clause = clause
+
+    def _compile(self) -> str:
+        return f"NOT {_group(self.clause)}"
+
+    def _bind(self, parameters: list[t.Any]) -> None:
+        self.clause._bind(parameters)
+
+    def _shape(self) -> t.Hashable:
+        return ("not", self.clause._shape())
+
+
+class Aggregate(Expression):
+    """
+    An SQL aggregate function over a column, created with `Field.sum()` and
+    friends. Aggregates can be selected with `Query.with_fields()` (e.g. per
+    `group_by()`) and computed with `Query.aggregate()`.
+    """
+
+    __slots__ = ("function", "argument", "distinct", "_label")
+
+    def __init__(self, function: t.Literal["COUNT", "SUM", "AVG", "MIN", "MAX"], argument: Column, distinct: bool = False) -> None:
+        super().__init__()
+
+        self.function = function
+        self.argument = argument
+        self.distinct = distinct
+        self._label: str | None = None
+
+    def _compile(self) -> str:
+        return f"{self.function}({'DISTINCT ' if self.distinct else ''}{self.argument._compile()})"
+
+    def _bind(self, parameters: list[t.Any]) -> None:
+        return
+
+    def _shape(self) -> t.Hashable:
+        return ("aggregate", self.function, self.distinct, self.argument._shape())
+
+    def _select(self) -> str:
+        if not self._label: return self._compile()
+        return self._compile() + " AS " + self._label
+
+    def get_name(self) -> str:
+        return self._label or self._compile()
+
+    @property
+    def _typecode(self) -> str | None:
+        """
+        The array typecode for the values of this aggregate, see 
+        `Query.columns()`.
+        """
+        if self.function == "COUNT": return "q"
+        if self.function == "AVG": return "d"
+
+        typecode = self.argument.field._typecode
+        if typecode is None or typecode == "d": return typecode
+
+        # Sums of booleans are counts, the minimum/maximum is a boolean again
+        return "q" if self.function == "SUM" else typecode
+
+    def label(self, label: str) -> t.Self:
+        self._label = label
+        return self
+
+
+class Ordering:
+    """
+    A field to order by, created with `Field.asc()` and `Field.desc()`.
+    """
+
+    __slots__ = ("field", "descending")
+
+    def __init__(self, field: 'Field[t.Any]', descending: bool = False) -> None:
+        self.field = field
+        self.descending = descending
+
+    def _compile(self) -> str:
+        return f"{self.field.get_name()} {'DESC' if self.descending else 'ASC'}"
+
+
+def _group(expression: Expression) -> str:
+    """
+    Compiles an operand, wrapped in parentheses when it is a compound
+    expression itself.
+    """
+    if isinstance(expression, (Column, Value)):
+        return expression._compile()
+
+    return f"({expression._compile()})"
+
+
+def operand(value: t.Any) -> Expression:
+    """
+    Converts Fields and plain Python values into expressions.
+    """
+    from .fields import Field
+
+    if isinstance(value, Expression): return value
+    if isinstance(value, Field): return Column(t.cast(Field[t.Any], value))
+
+    return Value(value)
+
+
+def _combine(operator: t.Literal["AND", "OR"], clauses: tuple[Expression, ...]) -> BooleanClause:
+    flattened: list[Expression] = []
+
+    # Flatten nested clauses of the same operator, (a & b) & c has the same
+    # shape as a & (b & c)
+    for clause in clauses:
+        if isinstance(clause, BooleanClause) and clause.operator == operator:
+            flattened.extend(clause.clauses)
+
+        else:
+            flattened.append(operand(clause))
+
+    return BooleanClause(operator, tuple(flattened))
+
+
+def and_(*clauses: Expression) -> BooleanClause:
+    return _combine("AND", clauses)
+
+
+def or_(*clauses: Expression) -> BooleanClause:
+    return _combine("OR", clauses)
+
+
+def not_(clause: Expression) -> Not:
+    return Not(clause)
@@ -1,8 +1,14 @@
 from giraffe_orm.schemas import table_pragma, FieldSchema
+from giraffe_orm.expressions import Aggregate, BinaryExpression, Between, Expression, IsNull, Column, In, Ordering, operand
+from giraffe_orm.indexes import Index
+from giraffe_orm.identity import current_identity_map
 
 from datetime import datetime
 
 import typing as t
+import decimal
+import json
+import copy
 
 
 if t.TYPE_CHECKING:
@@ -16,15 +22,19 @@ def _is_valid(value: t.Any, expected_type: type, name: str) -> bool:
     return True
 
 
-class Clause(t.TypedDict):
-    lhs: str
-    rhs: t.Any
+T = t.TypeVar('T')
 
 
-T = t.TypeVar('T')
+# Defaults which are evaluated by the database instead of being a value
+SQL_DEFAULTS = ("CURRENT_TIMESTAMP", "CURRENT_DATE", "CURRENT_TIME")
 
 
 class Field(t.Generic[T]):
+    # The array typecode for the values of this field (see `Query.columns()`)
+    _typecode: str | None = None
+    # Whether values are bound differently than they are held (see `_to_db()`)
+    _adapted = False
+
     def __init__(
             self, 
             type: str, 
@@ -32,6 +42,7 @@ class Field(t.Generic[T]):
             primary_key: bool = False, 
             unique: bool = False, 
             default: t.Any | None = None,
+            index: bool = False,
         ) -> None:
         
         self.name = "UNSET"
@@ -40,6 +51,7 @@ class Field(t.Generic[T]):
         self.primary_key = primary_key
         self.unique = unique
         self.default = default
+        self.index = index
 
         self.max_length = None
         self.min_length = None
@@ -57,7 +69,6 @@ class Field(t.Generic[T]):
         }
     
     def _get_schema_changes(self, old_schema: table_pragma) -> FieldSchema | None:
-        print("\t[FIELD OLD SCHEMA]: ", old_schema)
         changes: dict[str, t.Any] = {}
 
         if self.type != old_schema[2]:
@@ -79,6 +90,29 @@ class Field(t.Generic[T]):
 
         return FieldSchema(**changes)
     
+    def _is_sql_default(self, value: t.Any) -> bool:
+        """
+        Whether value is this field's default and has to be left to the 
+        database (e.g. CURRENT_TIMESTAMP).
+        """
+        return isinstance(value, str) and value in SQL_DEFAULTS and value == self.default
+    
+    def _to_db(self, value: t.Any) -> t.Any:
+        """
+        The value bound to statements for value (not None), for fields which
+        store values differently than they are held (see `Json`).
+        """
+        return value
+    
+    def _get_index(self) -> 'Index | None':
+        """
+        The index this field declares (a UNIQUE index for unique fields), the
+        primary key is indexed already.
+        """
+        if self.primary_key or not (self.unique or self.index): return None
+
+        return Index(self, unique=self.unique)
+    
     def _select(self) -> str:
         if not self.__label: return self.name
         return self.name + " AS " + self.__label
@@ -86,9 +120,25 @@ class Field(t.Generic[T]):
     def get_name(self) -> str:
         return self.name
     
+    def get_label(self) -> str:
+        return self.__label or self.name
+    
     def label(self, label: str) -> t.Self:
-        self.__label = label
-        return self
+        """
+        Returns a copy of this field selected as label (see 
+        `Query.with_fields()`), the field itself is left unchanged.
+        """
+        field = copy.copy(self)
+        field.__label = label
+
+        return field
+
+    def parse(self, text: str) -> T:
+        """
+        Converts the text representation of a value (e.g. a CSV cell) to the
+        type of this field.
+        """
+        return t.cast(T, text)
 
     def valid(self, value: str) -> tuple[bool, str]:
         if self.max_length and len(value) > self.max_length:
@@ -106,21 +156,113 @@ class Field(t.Generic[T]):
     def __get__(self, instance: 'Model | None', owner: t.Any) -> T | "Field[T]":
         if instance is None: return self
         
-        return t.cast(T, instance._data.get(self.name, self.default))
+        try:
+            return t.cast(T, instance._data[self.name])
+
+        # Not loaded (see Query.load_fields)
+        except KeyError:
+            return t.cast(T, instance._load_field(self.name, self.default))
 
     def __set__(self, instance: 'Model', value: str) -> None:
+        # Unchanged instances share their original values with the current 
+        # ones, copy them before the first change.
+        if instance._original_data is instance._data:
+            instance._original_data = dict(instance._data)
+
+            # Changed instances of an active Session are saved on flush
+            identity_map = current_identity_map()
+            if identity_map is not None: identity_map.changed(instance)
+
         instance._data[self.name] = value
 
-    def __add__(self, value: T) -> Clause:
-        return {
-            "lhs": self.get_name() + " +",
-            "rhs": value
-        }
+    # --- Expressions ---
+
+    def _compare(self, operator: str, value: t.Any) -> BinaryExpression:
+        return BinaryExpression(Column(self), operator, operand(value))
+
+    def __eq__(self, value: t.Any) -> t.Any:
+        expression = IsNull(Column(self)) if value is None else self._compare("=", value)
+        expression._identity = self is value
+
+        return expression
+
+    def __ne__(self, value: t.Any) -> t.Any:
+        expression = IsNull(Column(self), negate=True) if value is None else self._compare("!=", value)
+        expression._identity = self is not value
+
+        return expression
+
+    # Fields are used as dictionary keys (e.g. Query.update), so they keep 
+    # hashing by identity even though == builds an expression.
+    __hash__ = object.__hash__
+
+    def __lt__(self, value: t.Any) -> BinaryExpression:
+        return self._compare("<", value)
+
+    def __le__(self, value: t.Any) -> BinaryExpression:
+        return self._compare("<=", value)
+
+    def __gt__(self, value: t.Any) -> BinaryExpression:
+        return self._compare(">", value)
+
+    def __ge__(self, value: t.Any) -> BinaryExpression:
+        return self._compare(">=", value)
+
+    def __add__(self, value: t.Any) -> BinaryExpression:
+        return self._compare("+", value)
+
+    def __sub__(self, value: t.Any) -> BinaryExpression:
+        return self._compare("-", value)
+
+    def __mul__(self, value: t.Any) -> BinaryExpression:
+        return self._compare("*", value)
+
+    def __truediv__(self, value: t.Any) -> BinaryExpression:
+        return self._compare("/", value)
+
+    def in_(self, values: t.Iterable[t.Any]) -> In:
+        return In(Column(self), values)
+
+    def not_in(self, values: t.Iterable[t.Any]) -> In:
+        return In(Column(self), values, negate=True)
+
+    def like(self, pattern: str) -> BinaryExpression:
+        return self._compare("LIKE", pattern)
+
+    def is_null(self) -> IsNull:
+        return IsNull(Column(self))
+
+    def is_not_null(self) -> IsNull:
+        return IsNull(Column(self), negate=True)
+
+    def between(self, low: t.Any, high: t.Any) -> Between:
+        return Between(Column(self), operand(low), operand(high))
+
+    def count(self, distinct: bool = False) -> Aggregate:
+        return Aggregate("COUNT", Column(self), distinct)
+
+    def sum(self) -> Aggregate:
+        return Aggregate("SUM", Column(self))
+
+    def avg(self) -> Aggregate:
+        return Aggregate("AVG", Column(self))
+
+    def min(self) -> Aggregate:
+        return Aggregate("MIN", Column(self))
+
+    def max(self) -> Aggregate:
+        return Aggregate("MAX", Column(self))
+
+    def asc(self) -> Ordering:
+        return Ordering(self)
+
+    def desc(self) -> Ordering:
+        return Ordering(self, descending=True)
 
 
 class String(Field[str]):
-    def __init__(self, nullable: bool = True, primary_key: bool = False, unique: bool = False, default: str | None = None, max_length: int | None = 255, min_length: int | None = 0) -> None:
-        super().__init__("VARCHAR", nullable, primary_key, unique)
+    def __init__(self, nullable: bool = True, primary_key: bool = False, unique: bool = False, default: str | None = None, max_length: int | None = 255, min_length: int | None = 0, index: bool = False) -> None:
+        super().__init__("VARCHAR", nullable, primary_key, unique, index=index)
 
         if max_length is not None and _is_valid(max_length, int, "max_length"):
             self.max_length = max_length
@@ -137,24 +279,296 @@ class String(Field[str]):
 
 
 class Integer(Field[int]):
-    def __init__(self, nullable: bool = True, primary_key: bool = False, unique: bool = False, default: int | None = None) -> None:
-        super().__init__('INTEGER', nullable, primary_key, unique)
+    _typecode = "q"
+
+    def __init__(self, nullable: bool = True, primary_key: bool = False, unique: bool = False, default: int | None = None, index: bool = False) -> None:
+        super().__init__('INTEGER', nullable, primary_key, unique, index=index)
 
         if default is not None and _is_valid(default, int, "default"):
             self.default = default
 
+    def parse(self, text: str) -> int:
+        return int(text)
+
 
 class Float(Field[float]):
-    def __init__(self, nullable: bool = True, primary_key: bool = False, unique: bool = False, default: float | None = None) -> None:
-        super().__init__('FLOAT', nullable, primary_key, unique)
+    _typecode = "d"
+
+    def __init__(self, nullable: bool = True, primary_key: bool = False, unique: bool = False, default: float | None = None, index: bool = False) -> None:
+        super().__init__('FLOAT', nullable, primary_key, unique, index=index)
 
         if default is not None and _is_valid(default, float, "default"):
             self.default = default
 
+    def parse(self, text: str) -> float:
+        return float(text)
+
 
 class Date(Field[datetime]):
-    def __init__(self, nullable: bool = True, primary_key: bool = False, unique: bool = False, default: t.Any | None = None) -> None:
+    def __init__(self, nullable: bool = True, primary_key: bool = False, unique: bool = False, default: t.Any | None = None, index: bool = False) -> None:
         if not default:
             default = "CURRENT_TIMESTAMP"
         
-        super().__init__('DATE', nullable, primary_key, unique, default)
+        super().__init__('DATE', nullable, primary_key, unique, default, index)
+
+    def parse(self, text: str) -> datetime:
+        return datetime.fromisoformat(text)
+
+    def __set__(self, instance: 'Model', value: t.Any) -> None:
+        # Text has to be an ISO 8601 date, the same as the stored dates
+        if isinstance(value, str) and value not in SQL_DEFAULTS:
+            value = datetime.fromisoformat(value)
+
+        super().__set__(instance, value)
+
+
+class Boolean(Field[bool]):
+    _typecode = "b"
+
+    def __init__(self, nullable: bool = True, primary_key: bool = False, unique: bool = False, default: bool | None = None, index: bool = False) -> None:
+        super().__init__('BOOLEAN', nullable, primary_key, unique, index=index)
+
+        if default is not None and _is_valid(default, bool, "default"):
+            self.default = default
+
+    def parse(self, text: str) -> bool:
+        value = text.strip().lower()
+
+        if value in ("1", "true", "t", "yes", "y"): return True
+        if value in ("0", "false", "f", "no", "n"): return False
+
+        raise ValueError(f"Invalid boolean '{text}' for {self.name}")
+
+
+class Json(Field[t.Any]):
+    """
+    Stores dictionaries and lists (or any other JSON value) as JSON text, 
+    with TEXT affinity so every value reads back as it was set. None is 
+    stored as NULL.
+    """
+
+    _adapted = True
+
+    def __init__(self, nullable: bool = True, index: bool = False) -> None:
+        super().__init__('JSON TEXT', nullable, index=index)
+
+    def _to_db(self, value: t.Any) -> str:
+        return json.dumps(value, separators=(",", ":"))
+
+    def _compare(self, operator: str, value: t.Any) -> BinaryExpression:
+        if not isinstance(value, Field | Expression): value = self._to_db(value)
+        return super()._compare(operator, value)
+
+    def in_(self, values: t.Iterable[t.Any]) -> In:
+        return super().in_(map(self._to_db, values))
+
+    def not_in(self, values: t.Iterable[t.Any]) -> In:
+        return super().not_in(map(self._to_db, values))
+
+    def parse(self, text: str) -> t.Any:
+        return json.loads(text)
+
+
+class Decimal(Field[decimal.Decimal]):
+    """
+    Stores decimal.Decimal values as text (TEXT affinity), so every digit 
+    and the exponent round-trip. In SQL they are compared and ordered as 
+    text.
+    """
+
+    def __init__(self, nullable: bool = True, primary_key: bool = False, unique: bool = False, default: decimal.Decimal | None = None, index: bool = False) -> None:
+        super().__init__('DECIMAL TEXT', nullable, primary_key, unique, index=index)
+
+        if default is not None and _is_valid(default, decimal.Decimal, "default"):
+            self.default = default
+
+    def parse(self, text: str) -> decimal.Decimal:
+        return decimal.Decimal(text)
+
+
+M = t.TypeVar('M', bound='Model')
+
+OnDelete = t.Literal["CASCADE", "SET NULL", "SET DEFAULT", "RESTRICT", "NO ACTION"]
+
+
+class ForeignKey(Field[M | None]):
+    """
+    References a row of another Model, stored as its primary key:
+
+        class Giraffe(db.Model):
+            zoo = db.ForeignKey("Zoo", related_name="giraffes")
+
+    `giraffe.zoo` returns the Zoo, loaded on first access unless the query 
+    used `select_related()` or `prefetch_related()`. Either a Zoo or its 
+    primary key can be assigned. The referenced Model gets a ReverseRelation
+    (`zoo.giraffes`), named after the table of this Model by default.
+    """
+
+    def __init__(self, to: t.Type[M] | str, nullable: bool = True, on_delete: OnDelete = "CASCADE", related_name: str | None = None, index: bool = True) -> None:
+        # The type follows the primary key of the referenced Model, which may
+        # not be defined yet (see `model`)
+        super().__init__("INTEGER", nullable, index=index)
+
+        self.to = to
+        self.on_delete = on_delete
+        self.related_name = related_name
+        self.owner: t.Type['Model'] | None = None
+
+    @property
+    def model(self) -> t.Type[M]:
+        """
+        The referenced Model, a name is looked up in the Model registry (or 
+        "self" for the Model declaring this field).
+        """
+        if isinstance(self.to, str):
+            from .models import Model
+
+            target = self.owner if self.to == "self" else next((model for model in Model._registry if model.__name__ == self.to), None)
+            if target is None: raise LookupError(f"Unknown Model '{self.to}' referenced by {self.name}")
+
+            self.to = t.cast(t.Type[M], target)
+
+        return self.to
+    
+    def _get_schema(self) -> FieldSchema:
+        self.type = self.model._primary_key.type
+
+        schema = super()._get_schema()
+        schema["references"] = f"{self.model._cls_tablename()}({self.model._primary_key.get_name()})"
+        schema["on_delete"] = self.on_delete
+
+        return schema
+    
+    def _get_schema_changes(self, old_schema: table_pragma) -> FieldSchema | None:
+        self.type = self.model._primary_key.type
+        return super()._get_schema_changes(old_schema)
+    
+    def _set_owner(self, owner: t.Type['Model']) -> None:
+        """
+        Called by the declaring Model, adds the ReverseRelation to the 
+        referenced Model once it is defined.
+        """
+        from .models import Model
+
+        self.owner = owner
+        self.related_name = self.related_name or owner._cls_tablename()
+
+        if isinstance(self.to, str) and self.to != "self" and not any(model.__name__ == self.to for model in Model._registry):
+            _pending_relations.append(self)
+            return
+
+        self._add_reverse_relation()
+
+    def _add_reverse_relation(self) -> None:
+        model = self.model
+        name = t.cast(str, self.related_name)
+
+        if hasattr(model, name):
+            raise ValueError(f"{model.__name__} already has an attribute '{name}', provide another related_name for {self.name}")
+
+        setattr(model, name, ReverseRelation(self, name))
+
+    def _to_pk(self, value: t.Any) -> t.Any:
+        """
+        The primary key of value if it is a Model instance, otherwise value.
+        """
+        from .models import Model
+
+        if not isinstance(value, Model): return value
+        return value._data.get(type(value)._primary_key.name)
+    
+    def parse(self, text: str) -> t.Any:
+        return self.model._primary_key.parse(text)
+    
+    def pk_of(self, instance: 'Model') -> t.Any:
+        """
+        The stored primary key of the referenced row, without loading it.
+        """
+        try:
+            return instance._data[self.name]
+
+        # Not loaded (see Query.load_fields)
+        except KeyError:
+            return instance._load_field(self.name, self.default)
+
+    @t.overload
+    def __get__(self, instance: None, owner: t.Any) -> "ForeignKey[M]": ...
+    @t.overload
+    def __get__(self, instance: 'Model', owner: t.Any) -> M | None: ...
+    def __get__(self, instance: 'Model | None', owner: t.Any) -> "M | None | ForeignKey[M]":
+        if instance is None: return self
+
+        found, related = instance._get_related(self.name)
+        if found: return related
+
+        pk = self.pk_of(instance)
+        if pk is None: return None
+
+        related = self.model.query.get(pk)
+        instance._set_related(self.name, related)
+
+        return related
+
+    def __set__(self, instance: 'Model', value: t.Any) -> None:
+        pk = self._to_pk(value)
+        super().__set__(instance, pk)
+
+        # Keep an assigned instance, a primary key is loaded on access
+        if pk is value: instance._unset_related(self.name)
+        else: instance._set_related(self.name, value)
+
+    def _compare(self, operator: str, value: t.Any) -> BinaryExpression:
+        return super()._compare(operator, self._to_pk(value))
+
+    def in_(self, values: t.Iterable[t.Any]) -> In:
+        return super().in_(map(self._to_pk, values))
+
+    def not_in(self, values: t.Iterable[t.Any]) -> In:
+        return super().not_in(map(self._to_pk, values))
+
+
+class ReverseRelation(t.Generic[M]):
+    """
+    The instances of another Model whose ForeignKey references an instance,
+    e.g. `zoo.giraffes`. They are queried on every access, unless the query 
+    used `prefetch_related()`.
+    """
+
+    def __init__(self, foreign_key: ForeignKey[t.Any], name: str) -> None:
+        self.foreign_key = foreign_key
+        self.name = name
+
+    @property
+    def model(self) -> t.Type['Model']:
+        """
+        The Model declaring the ForeignKey.
+        """
+        return t.cast(t.Type['Model'], self.foreign_key.owner)
+
+    @t.overload
+    def __get__(self, instance: None, owner: t.Any) -> "ReverseRelation[M]": ...
+    @t.overload
+    def __get__(self, instance: 'Model', owner: t.Any) -> list[t.Any]: ...
+    def __get__(self, instance: 'Model | None', owner: t.Any) -> "list[t.Any] | ReverseRelation[M]":
+        if instance is None: return self
+
+        found, related = instance._get_related(self.name)
+        if found: return related
+
+        from .queries import Query
+
+        query: Query['Model', 'Model'] = Query(self.model)
+        return query.filter(self.foreign_key == instance._get_pk()[1]).all()
+
+
+# ForeignKeys referencing a Model by name before it is defined
+_pending_relations: list[ForeignKey[t.Any]] = []
+
+
+def resolve_relations(model: t.Type['Model']) -> None:
+    """
+    Adds the ReverseRelations of ForeignKeys that referenced model by name.
+    """
+    for field in [field for field in _pending_relations if field.to == model.__name__]:
+        _pending_relations.remove(field)
+        field._add_reverse_relation()
@@ -0,0 +1,131 @@
+from contextvars import ContextVar, Token
+
+import typing as t
+import weakref
+
+
+if t.TYPE_CHECKING:
+    from .models import Model
+
+
+T = t.TypeVar("T", bound='Model')
+
+
+class IdentityMap:
+    """
+    Keeps a single instance per (Model, primary key) while active. Queries
+    return the already loaded instance for rows which are in the map, and
+    `Query.get()` skips the database entirely:
+
+        with IdentityMap():
+            giraffe = Giraffe.query.first()
+            assert Giraffe.query.get(giraffe.primary_key) is giraffe
+
+    Instances are held by weak references, an instance which is no longer
+    used elsewhere simply drops out of the map, unless it was changed. 
+    Loading a row again does not overwrite the values of the instance in the
+    map, so unsaved changes are kept.
+    """
+
+    def __init__(self) -> None:
+        self._instances: weakref.WeakValueDictionary[tuple[t.Type['Model'], t.Any], 'Model'] = weakref.WeakValueDictionary()
+        self._changed: dict[int, 'Model'] = {}
+        self._tokens: list[Token['IdentityMap | None']] = []
+
+
+    def __enter__(self) -> t.Self:
+        self._tokens.append(_current.set(self))
+        return self
+
+    def __exit__(self, *_: t.Any) -> None:
+        _current.reset(self._tokens.pop())
+
+
+    def __len__(self) -> int:
+        return len(self._instances)
+
+    def __contains__(self, instance: 'Model') -> bool:
+        return self._instances.get(_key(instance)) is instance
+
+    def __iter__(self) -> t.Iterator['Model']:
+        return iter(list(self._instances.values()))
+
+
+    def get(self, model: t.Type[T], pk: t.Any) -> T | None:
+        return t.cast(T | None, self._instances.get((model, pk)))
+
+
+    def add(self, instance: 'Model') -> None:
+        pk = _key(instance)[1]
+        if pk is None: return
+
+        self._instances[_key(instance)] = instance
+
+
+    def changed(self, instance: 'Model') -> None:
+        """
+        Keeps a changed instance of the map alive until it is removed, so its
+        changes can still be saved (see `Session`).
+        """
+        if self._instances.get(_key(instance)) is instance:
+            self._changed[id(instance)] = instance
+
+
+    def remove(self, instance: 'Model') -> None:
+        key = _key(instance)
+
+        if self._instances.get(key) is instance:
+            del self._instances[key]
+
+        self._changed.pop(id(instance), None)
+
+
+    def evict(self, model: t.Type['Model'], pks: t.Iterable[t.Any] | None = None) -> None:
+        """
+        Removes the instances of model with the provided primary keys, or all
+        instances of model (e.g. after their rows were deleted).
+        """
+        keys = [key for key in list(self._instances.keys()) if key[0] is model] if pks is None else [(model, pk) for pk in pks]
+
+        for key in keys:
+            instance = self._instances.pop(key, None)
+            if instance is not None: self._changed.pop(id(instance), None)
+
+
+    def clear(self) -> None:
+        self._instances.clear()
+        self._changed.clear()
+
+
+    def load(self, model: t.Type[T], row: tuple[t.Any, ...], names: tuple[str, ...] | None = None, hydrate: t.Callable[[tuple[t.Any, ...]], T] | None = None) -> T:
+        """
+        Returns the instance in the map for row, or hydrates and adds it. The
+        row has all columns of model, or only those of names. Fields which 
+        the instance in the map did not load yet are taken from the row.
+        """
+        pk_index = model._pk_index if names is None else names.index(model._primary_key.name)
+        key = (model, row[pk_index])
+        instance = self._instances.get(key)
+
+        if instance is None:
+            instance = (hydrate or model._hydrate)(row)
+            self._instances[key] = instance
+
+        elif len(instance._data) < len(model._column_names):
+            instance._fill(names or model._column_names, row)
+
+        return t.cast(T, instance)
+
+
+def _key(instance: 'Model') -> tuple[t.Type['Model'], t.Any]:
+    return type(instance), instance._get_pk()[1]
+
+
+_current: ContextVar[IdentityMap | None] = ContextVar("giraffe_orm_identity_map", default=None)
+
+
+def current_identity_map() -> IdentityMap | None:
+    """
+    Returns the IdentityMap active in the current context, if any.
+    """
+    return _current.get()
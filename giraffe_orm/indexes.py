@@ -0,0 +1,73 @@
+from giraffe_orm.schemas import IndexSchema
+from giraffe_orm.expressions import Expression
+
+import typing as t
+
+
+if t.TYPE_CHECKING:
+    from .fields import Field
+
+
+class Index:
+    """
+    A (composite, unique and/or partial) index declared on a Model:
+
+        class Giraffe(db.Model):
+            __indexes__ = [
+                db.Index(number, date),
+                db.Index(name, unique=True, where=number > 0),
+            ]
+
+    Without a name, the index is named after its table and columns.
+    """
+
+    def __init__(self, *columns: 'Field[t.Any] | str', unique: bool = False, where: Expression | str | None = None, name: str | None = None) -> None:
+        if not columns: raise ValueError("An index needs at least one column")
+
+        self.columns = columns
+        self.unique = unique
+        self.where = where
+        self.name = name
+
+
+    def _column_names(self) -> list[str]:
+        return [column if isinstance(column, str) else column.get_name() for column in self.columns]
+
+
+    def _where_sql(self) -> str | None:
+        """
+        Index definitions cannot have parameters, the values of a where
+        expression are written as SQL literals.
+        """
+        if self.where is None or isinstance(self.where, str): return self.where
+
+        values: list[t.Any] = []
+        self.where._bind(values)
+
+        parts = self.where._compile().split("?")
+        sql = parts[0]
+
+        for value, part in zip(values, parts[1:]):
+            sql += _literal(value) + part
+
+        return sql
+
+
+    def _get_schema(self, tablename: str) -> IndexSchema:
+        columns = self._column_names()
+        name = self.name or f"{'ux' if self.unique else 'ix'}_{tablename}_{'_'.join(columns)}"
+
+        return {
+            "name": name,
+            "columns": columns,
+            "unique": self.unique,
+            "where": self._where_sql(),
+        }
+
+
+def _literal(value: t.Any) -> str:
+    if value is None: return "NULL"
+    if isinstance(value, bool): return str(int(value))
+    if isinstance(value, (int, float)): return repr(value)
+
+    return "'" + str(value).replace("'", "''") + "'"
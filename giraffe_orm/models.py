@@ -1,10 +1,14 @@
-from giraffe_orm.connections import query_all, change_db
-from giraffe_orm.queries import Query
-from giraffe_orm.schemas import table_pragma, Schema, RawFieldSchema, RenameFieldSchema, FieldSchema
-from giraffe_orm.fields import Field
+from giraffe_orm.connections import query_all, change_db, get_database
+from giraffe_orm.queries import Query, DEFAULT_IN_BATCH_SIZE
+from giraffe_orm.schemas import table_pragma, index_pragma, Schema, RawFieldSchema, RenameFieldSchema, FieldSchema, IndexSchema
+from giraffe_orm.fields import Field, ForeignKey, resolve_relations
+from giraffe_orm.indexes import Index
+from giraffe_orm.identity import current_identity_map
+from giraffe_orm.converters import row_converter
 
 from typing_extensions import Self
 import typing as t
+import weakref
 
 
 T = t.TypeVar("T", bound='Model')
@@ -21,38 +25,149 @@ def _get_rename_field_schema(name: str, old_name: str) -> RenameFieldSchema:
     }
 
 
-class Model:
-    query: Query[Self, Self]
+def _make_hydrator(cls: t.Type[T], names: tuple[str, ...] | None = None) -> t.Callable[[tuple[t.Any, ...]], T]:
+    """
+    Builds the function which turns a row (in the order of the Model's 
+    columns, or of names) into a loaded instance, without going through 
+    `__init__` and the Field descriptors.
+    """
+    names = names or cls._column_names
+    new = object.__new__
 
+    def hydrate(row: tuple[t.Any, ...]) -> T:
+        instance = new(cls)
 
-    _data: dict[str, t.Any] = {}
-    _original_data: dict[str, t.Any] = {}
+        # The original values share the dict until the first change (see 
+        # Field.__set__), loading a row only allocates a single dict.
+        data = dict(zip(names, row))
+        instance._data = data
+        instance._original_data = data
+        instance._persisted = True
+        instance._deferred = None
+
+        return instance
+
+    return hydrate
+
+
+class _DeferredLoad:
+    """
+    The fields which were not loaded for the instances of a single query 
+    (see `Query.load_fields()`). The first access to any of them loads them 
+    for all instances at once.
+    """
+
+    __slots__ = ("model", "names", "instances")
+
+    def __init__(self, model: t.Type['Model'], names: tuple[str, ...]) -> None:
+        self.model = model
+        self.names = names
+        self.instances: weakref.WeakSet['Model'] = weakref.WeakSet()
+
+
+    def load(self) -> None:
+        instances = [instance for instance in self.instances if instance._deferred is self]
+        self.instances.clear()
+
+        pk_name = self.model._primary_key.get_name()
+        columns = ", ".join((pk_name, *self.names))
+        rows: dict[t.Any, tuple[t.Any, ...]] = {}
+
+        for start in range(0, len(instances), DEFAULT_IN_BATCH_SIZE):
+            pks = [instance._get_pk()[1] for instance in instances[start:start + DEFAULT_IN_BATCH_SIZE]]
+            query = f"SELECT {columns} FROM {self.model._cls_tablename()} WHERE {pk_name} IN ({', '.join('?' for _ in pks)})"
+
+            for row in query_all(query, tuple(pks), self.model):
+                rows[row[0]] = row[1:]
+
+        convert = self.model._row_converter(self.names)
+
+        # Instances whose row no longer exists keep their fields unloaded
+        for instance in instances:
+            instance._deferred = None
+
+            row = rows.get(instance._get_pk()[1])
+            if row is None: continue
+
+            instance._fill(self.names, row if convert is None else convert(row))
+
+
+class _QueryDescriptor:
+    """
+    `Model.query` returns a new Query on every access, which holds no state 
+    shared with other queries.
+    """
+
+    def __get__(self, instance: t.Any, owner: t.Type[T]) -> Query[T, T]:
+        return Query(owner)
+
+
+class _ModelMeta(type):
+    """
+    Declares empty `__slots__` on every Model which does not declare its own,
+    so instances of subclasses get no `__dict__` either.
+    """
+
+    def __new__(mcs, name: str, bases: tuple[type, ...], namespace: dict[str, t.Any], **kwargs: t.Any) -> '_ModelMeta':
+        namespace.setdefault("__slots__", ())
+        return super().__new__(mcs, name, bases, namespace, **kwargs)
+
+
+class Model(metaclass=_ModelMeta):
+    # Instances only hold their values, all per-Model state lives on the class
+    __slots__ = ("_data", "_original_data", "_persisted", "_deferred", "_related", "__weakref__")
+
+    query = _QueryDescriptor()
+
+
+    _data: dict[str, t.Any]
+    _original_data: dict[str, t.Any]
+    _persisted: bool
+    _deferred: _DeferredLoad | None
+    _related: dict[str, t.Any]
     
     _fields: list[Field[t.Any]] = []
+    _foreign_keys: list[ForeignKey[t.Any]] = []
+    _column_names: tuple[str, ...] = ()
     _primary_key: Field[t.Any]
+    _pk_index: int
+    _indexes: list[Index] = []
+    _hydrate: t.Callable[[tuple[t.Any, ...]], t.Any]
+    _partial_hydrators: dict[tuple[str, ...], t.Callable[[tuple[t.Any, ...]], t.Any]] = {}
+    _row_converters: dict[tuple[str, ...], t.Callable[[tuple[t.Any, ...]], tuple[t.Any, ...]] | None] = {}
+    _adapted_fields: dict[str, Field[t.Any]] = {}
+    _date_field_cache: t.ClassVar[str | None] = None
 
     _tablename: str | None = None
     _registry: list[t.Type['Model']] = []
 
 
     def __init__(self, **kwargs: dict[str, t.Any]) -> None:
-        self._data = {}
-        self._original_data = {}
+        data: dict[str, t.Any] = {}
         
         for field in self._fields:
-            val = kwargs.get(field.name, getattr(field, 'default', None))
-            
-            setattr(self, field.name, val)
-            self._data[field.name] = val
-            self._original_data[field.name] = val
+            data[field.name] = kwargs.get(field.name, field.default)
+
+        self._data = data
+        self._original_data = data
+        self._persisted = False
+        self._deferred = None
+
+        # Related instances are stored as their primary key
+        for field in self._foreign_keys:
+            value = data[field.name]
+            if value is None: continue
+
+            data[field.name] = field._to_pk(value)
+            if data[field.name] is not value: self._set_related(field.name, value)
 
 
     def __init_subclass__(cls: t.Type[T], is_abstract: bool = False, **kwargs: dict[str, t.Any]):
         super().__init_subclass__(**kwargs)
-        cls.query = Query(cls)
 
         # Initialize class specific storage
         cls._fields = []
+        cls._foreign_keys = []
         found_pk: Field[t.Any] | None = None
 
         # Any non-abstract class should be taken up into the registry.
@@ -68,14 +183,31 @@ class Model:
             value.name = name
             cls._fields.append(value)   # type: ignore
 
+            if isinstance(value, ForeignKey): cls._foreign_keys.append(value)     # type: ignore
+
             if not value.primary_key: continue
-            if found_pk != None:
+            if found_pk is not None:
                 raise TypeError(f"You cannot have multiple primary keys")
             
             found_pk = value     # type: ignore
 
         if not found_pk: raise ValueError("No primary key defined for Model")
         cls._primary_key = found_pk     # type: ignore
+        cls._column_names = tuple(field.name for field in cls._fields)
+        cls._pk_index = cls._column_names.index(found_pk.name)
+
+        # Indexes declared by fields (index / unique) and composite or 
+        # partial indexes of `__indexes__`
+        cls._indexes = [index for field in cls._fields if (index := field._get_index())]
+        cls._indexes.extend(getattr(cls, "__indexes__", []))
+        cls._hydrate = _make_hydrator(cls)
+        cls._partial_hydrators = {}
+        cls._row_converters = {}
+        cls._adapted_fields = {field.name: field for field in cls._fields if field._adapted}
+        cls._date_field_cache = None
+
+        for field in cls._foreign_keys: field._set_owner(cls)
+        if not is_abstract: resolve_relations(cls)
 
 
     @classmethod
@@ -108,16 +240,44 @@ class Model:
                 yield field
 
     @classmethod
-    def _get_column_names(cls):
-        names: list[str] = []
+    def _get_column_names(cls) -> tuple[str, ...]:
+        return cls._column_names
+    
+    @classmethod
+    def _get_indexes(cls) -> list[IndexSchema]:
+        return [index._get_schema(cls._cls_tablename()) for index in cls._indexes]
 
-        for _, value in cls.__dict__.items():
-            if not isinstance(value, Field): continue
+    @classmethod
+    def _get_index_changes(cls) -> tuple[list[IndexSchema], list[str]]:
+        """
+        Compares the declared indexes against those in the database. Returns 
+        the indexes to create and the names of the indexes to drop (changed 
+        indexes are in both).
+        """
+        old_indexes: list[index_pragma] = query_all(f"PRAGMA index_list({cls._cls_tablename()})", model=cls)
+        indexes = {index["name"]: index for index in cls._get_indexes()}
 
-            names.append(value.name)
+        create: list[IndexSchema] = []
+        drop: list[str] = []
+
+        # Only indexes created with CREATE INDEX (origin "c") are managed,
+        # not those backing PRIMARY KEY and UNIQUE constraints
+        for old_index in old_indexes:
+            if old_index[3] != "c": continue
+
+            index = indexes.pop(old_index[1], None)
+            columns = [info[2] for info in query_all(f"PRAGMA index_info({old_index[1]})", model=cls)]
+
+            if index and index["columns"] == columns and index["unique"] == bool(old_index[2]) and (index["where"] is not None) == bool(old_index[4]):
+                continue
+
+            drop.append(old_index[1])
+            if index: create.append(index)
+
+        create.extend(indexes.values())
+
+        return create, drop
 
-        return names
-    
     @classmethod
     def _get_schema_changes(cls) -> Schema | None:
         """
@@ -128,10 +288,8 @@ class Model:
         
         __dropped_fields: dict[RawFieldSchema, table_pragma] = {}
         altered_fields: list[RawFieldSchema] = []
-        old_schemas: list[table_pragma] = query_all(f"PRAGMA table_info({cls._cls_tablename()})")
+        old_schemas: list[table_pragma] = query_all(f"PRAGMA table_info({cls._cls_tablename()})", model=cls)
         schema_keys: list[str] = []
-
-        print("\told_schemas: ", old_schemas)
         
         # If not previous schema exists, we may just return the current schema
         if not old_schemas: return cls._get_schema()
@@ -186,14 +344,17 @@ class Model:
             altered_fields.append(schema)
 
 
-        if not altered_fields: return None
-        print("\tschemas: ", altered_fields)
+        indexes, drop_indexes = cls._get_index_changes()
+
+        if not altered_fields and not indexes and not drop_indexes: return None
 
 
         return {
             "tablename": cls._cls_tablename(),
             "create": [],
-            "alter": altered_fields
+            "alter": altered_fields,
+            "indexes": indexes,
+            "drop_indexes": drop_indexes
         }
     
 
@@ -219,16 +380,124 @@ class Model:
         return {
             "tablename": cls()._cls_tablename(),
             "create": fields,
-            "alter": []
+            "alter": [],
+            "indexes": cls._get_indexes(),
+            "drop_indexes": []
         }
     
 
     @classmethod
-    def _from_db(cls, row: tuple[t.Any, ...]) -> Self:
-        field_names = cls._get_column_names()
-        field_values = dict(zip(field_names, row))
+    def _from_db(cls, row: tuple[t.Any, ...], names: tuple[str, ...] | None = None) -> Self:
+        return cls._from_rows((row,), names)[0]
+    
+
+    @classmethod
+    def _from_rows(cls, rows: t.Iterable[tuple[t.Any, ...]], names: tuple[str, ...] | None = None) -> list[Self]:
+        """
+        Hydrates rows with all columns, or with only the columns of names (the
+        primary key included). The other fields of such partially loaded 
+        instances are loaded on first access.
+        """
+        identity_map = current_identity_map()
+
+        convert = cls._row_converter(names or cls._column_names)
+        if convert is not None: rows = map(convert, rows)
+
+        if names is None or names == cls._column_names:
+            if identity_map is None: return list(map(cls._hydrate, rows))
+            return [identity_map.load(cls, row) for row in rows]
+
+        hydrate = cls._partial_hydrators.get(names)
+
+        if hydrate is None:
+            hydrate = cls._partial_hydrators[names] = _make_hydrator(cls, names)
+
+        if identity_map is None:
+            instances = list(map(hydrate, rows))
+
+        else:
+            instances = [identity_map.load(cls, row, names, hydrate) for row in rows]
+
+        deferred = _DeferredLoad(cls, tuple(name for name in cls._column_names if name not in names))
+
+        for instance in instances:
+            if instance._deferred is not None or len(instance._data) == len(cls._column_names): continue
+
+            instance._deferred = deferred
+            deferred.instances.add(instance)
+
+        return instances
+
+
+    @classmethod
+    def _row_converter(cls, names: tuple[str, ...]) -> t.Callable[[tuple[t.Any, ...]], tuple[t.Any, ...]] | None:
+        """
+        Converts rows with the columns of names as stored to their values 
+        (e.g. DATE columns to datetime), None when no column is converted.
+        """
+        if names in cls._row_converters: return cls._row_converters[names]
+
+        # Built on first use, the type of a ForeignKey is only known once the
+        # referenced Model is defined
+        types = {field.name: field.type for field in cls._fields}
+        convert = cls._row_converters[names] = row_converter([types[name] for name in names])
+
+        return convert
 
-        return cls(**field_values)
+
+    def loaded_fields(self) -> tuple[str, ...]:
+        """
+        Returns the names of the fields whose values are loaded, see 
+        `Query.load_fields()`.
+        """
+        return tuple(self._data)
+
+
+    def _fill(self, names: tuple[str, ...], row: tuple[t.Any, ...]) -> None:
+        """
+        Sets the values of fields which are not loaded yet, as stored in the 
+        database.
+        """
+        for name, value in zip(names, row):
+            if name in self._data: continue
+
+            self._data[name] = value
+            if self._original_data is not self._data: self._original_data[name] = value
+
+        if len(self._data) == len(self._column_names): self._deferred = None
+
+
+    def _load_field(self, name: str, default: t.Any) -> t.Any:
+        """
+        Loads the deferred fields on first access (see `_DeferredLoad`).
+        """
+        if self._deferred is not None: self._deferred.load()
+
+        return self._data.get(name, default)
+    
+
+    def _get_related(self, name: str) -> tuple[bool, t.Any]:
+        """
+        Returns whether the related instance(s) of name (a ForeignKey or a
+        ReverseRelation) are loaded, and those instances.
+        """
+        related: dict[str, t.Any] | None = getattr(self, "_related", None)
+        if related is None or name not in related: return False, None
+
+        return True, related[name]
+
+
+    def _set_related(self, name: str, value: t.Any) -> None:
+        # Only instances with related instances allocate the dict
+        related: dict[str, t.Any] | None = getattr(self, "_related", None)
+
+        if related is None: self._related = {name: value}
+        else: related[name] = value
+
+
+    def _unset_related(self, name: str) -> None:
+        related: dict[str, t.Any] | None = getattr(self, "_related", None)
+        if related is not None: related.pop(name, None)
     
 
     def _get_pk(self) -> tuple[str, t.Any]:
@@ -244,20 +513,98 @@ class Model:
         )
 
 
-    def save(self) -> None:
-        changed_fields: list[str] = []
-        changed_values: list[t.Any] = []
+    def _insert_values(self) -> tuple[tuple[str, ...], tuple[t.Any, ...]]:
+        """
+        Returns the columns and values to INSERT this instance with. Unset 
+        (None) values and database evaluated defaults are left to the 
+        database.
+        """
+        columns: list[str] = []
+        values: list[t.Any] = []
+        adapted = self._adapted_fields
 
-        # Loop over all the fields of this Model and check whether their values
-        # changed. If so store the field names and the new values
         for field in self._fields:
-            value = self._data[field.get_name()]
-            if self._original_data[field.get_name()] == value: continue
+            value = self._data.get(field.name)
+            if value is None or field._is_sql_default(value): continue
 
-            changed_fields.append(field.get_name())
-            changed_values.append(value)
+            columns.append(field.name)
+            values.append(field._to_db(value) if field.name in adapted else value)
 
-        if not changed_fields: return
+        return tuple(columns), tuple(values)
+
+
+    def _set_persisted(self, pk: t.Any = None, names: t.Iterable[str] | None = None) -> None:
+        """
+        Marks the current values (optionally only those of names) as stored 
+        in the database, optionally with the primary key the database 
+        assigned.
+        """
+        if pk is not None:
+            if self._original_data is self._data: self._original_data = dict(self._data)
+            self._data[type(self)._primary_key.name] = pk
+
+        self._persisted = True
+
+        if names is None:
+            self._original_data = dict(self._data)
+            return
+
+        for name in names:
+            self._original_data[name] = self._data[name]
+
+
+    def _get_changes(self, names: t.Container[str] | None = None) -> dict[str, t.Any]:
+        """
+        Returns the names and new values (as bound to statements) of all 
+        fields (optionally limited to names) whose values changed since they 
+        were loaded or saved. Fields which are not loaded are skipped.
+        """
+        changes: dict[str, t.Any] = {}
+        if self._original_data is self._data: return changes
+
+        # Loop over all the loaded fields of this Model and check whether 
+        # their values changed. If so store the field names and the new values
+        for name, value in self._data.items():
+            if names is not None and name not in names: continue
+            if name in self._original_data and self._original_data[name] == value: continue
+
+            changes[name] = value
+
+        return self._adapt_values(changes) if self._adapted_fields else changes
+
+
+    @classmethod
+    def _adapt_values(cls, values: dict[str, t.Any]) -> dict[str, t.Any]:
+        """
+        Replaces the values (by field name) of fields which store values 
+        differently than they are held, see `Field._to_db()`.
+        """
+        for name, field in cls._adapted_fields.items():
+            value = values.get(name)
+            if value is not None: values[name] = field._to_db(value)
+
+        return values
+
+
+    def _set_row(self, row: tuple[t.Any, ...]) -> None:
+        """
+        Replaces all values with a row as stored in the database.
+        """
+        convert = self._row_converter(self._column_names)
+        if convert is not None: row = convert(row)
+
+        self._data = dict(zip(self._get_column_names(), row))
+        self._original_data = self._data
+        self._persisted = True
+        self._deferred = None
+
+
+    def save(self) -> None:
+        changes = self._get_changes()
+        if not changes: return
+
+        changed_fields = list(changes.keys())
+        changed_values = list(changes.values())
 
         pk_name = type(self)._primary_key.get_name()
         query = \
@@ -270,6 +617,38 @@ class Model:
         # As final parameter, we add the identifier for this modal (whatever 
         # its value is for the primary key field)
         changed_values.append(self._original_data[pk_name])
-        change_db(query, tuple(changed_values))
+        change_db(query, tuple(changed_values), type(self))
 
+        self._set_persisted(names=changed_fields)
         return
+
+
+    async def save_async(self) -> None:
+        """
+        Awaitable version of `save()`, executed on the Database worker threads.
+        """
+        return await get_database().run_async(self.save)
+
+
+    def delete(self) -> None:
+        """
+        Deletes the row of this instance, it can be inserted again with 
+        `Model.query.bulk_create()`.
+        """
+        if not self._persisted: raise ValueError(f"Cannot delete {type(self).__name__}, it is not stored in the database")
+
+        pk_name, pk = self._get_pk()
+        change_db(f"DELETE FROM {self._cls_tablename()} WHERE {pk_name} = ?", (pk,), type(self))
+
+        self._persisted = False
+
+        identity_map = current_identity_map()
+        if identity_map is not None: identity_map.remove(self)
+
+
+    async def delete_async(self) -> None:
+        """
+        Awaitable version of `delete()`, executed on the Database worker 
+        threads.
+        """
+        return await get_database().run_async(self.delete)
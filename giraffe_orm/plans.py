@@ -0,0 +1,32 @@
+import typing as t
+import re
+
+
+_table = re.compile(r"^(?:SCAN|SEARCH) (?:TABLE )?(\w+)")
+
+
+class PlanStep(t.NamedTuple):
+    """
+    A single row of `EXPLAIN QUERY PLAN`, `parent` refers to the id of the 
+    enclosing step.
+    """
+    id: int
+    parent: int
+    detail: str
+
+    @property
+    def table(self) -> str | None:
+        match = _table.match(self.detail)
+        return match.group(1) if match else None
+
+    @property
+    def is_full_scan(self) -> bool:
+        """
+        Whether every row of a table is visited. Scans in the order of an
+        index (e.g. ORDER BY with LIMIT) do not count.
+        """
+        return self.table is not None and self.detail.startswith("SCAN") and " USING " not in self.detail
+
+    @property
+    def sorts_in_temp_btree(self) -> bool:
+        return "USE TEMP B-TREE FOR ORDER BY" in self.detail
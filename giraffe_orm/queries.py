@@ -1,9 +1,22 @@
-from giraffe_orm.connections import query_one, change_db, query_all
-from giraffe_orm.fields import Field, Date, datetime, Clause
-
+from giraffe_orm.connections import query_one, change_db, change_many, change_returning, insert_many, query_all, query_chunks, explain, get_database, DEFAULT_CHUNK_SIZE, SUPPORTS_RETURNING
+from giraffe_orm.fields import Field, Date, ForeignKey, ReverseRelation, datetime
+from giraffe_orm.expressions import Aggregate, Column, Expression, Ordering, and_, operand
+from giraffe_orm.identity import current_identity_map
+from giraffe_orm.caching import DEFAULT_TTL
+from giraffe_orm.converters import adapt, row_converter
+from giraffe_orm.plans import PlanStep
+
+from array import array
 from enum import Enum
 
 import typing as t
+import binascii
+import importlib
+import itertools
+import base64
+import threading
+import json
+import math
 
 
 if t.TYPE_CHECKING:
@@ -12,6 +25,7 @@ if t.TYPE_CHECKING:
 
 MT = t.TypeVar("MT", bound='Model')
 RT = t.TypeVar("RT")
+R = t.TypeVar("R")
 T1 = t.TypeVar("T1")
 
 Ts = t.TypeVarTuple("Ts")
@@ -22,7 +36,81 @@ class QueryMode(Enum):
     ROWS = 1
 
 
+class CompiledQuery(t.NamedTuple):
+    """
+    The SQL of a query shape, together with the names of the runtime values
+    (in order) that have to be bound to its placeholders.
+    """
+    sql: str
+    parameters: tuple[str, ...]
+
+
+class Page(t.NamedTuple, t.Generic[RT]):
+    """
+    A page of results, `next_cursor` is None on the last page.
+    """
+    items: list[RT]
+    next_cursor: str | None
+
+
+AGGREGATES = ("sum", "avg", "min", "max", "count")
+
+MAX_COMPILED_QUERIES = 1024
+DEFAULT_BATCH_SIZE = 1000
+
+# Stays below the (pre 3.32) SQLite limit of 999 variables per statement
+DEFAULT_IN_BATCH_SIZE = 500
+DEFAULT_DELETE_BATCH_SIZE = DEFAULT_IN_BATCH_SIZE
+
+# The default SQLite limit of variables per statement from 3.32 onwards, so
+# for every version supporting RETURNING
+MAX_VARIABLES = 32766
+
+_compiled_queries: dict[tuple[t.Any, ...], CompiledQuery] = {}
+_compiled_stats = {"hits": 0, "misses": 0}
+
+# Only taken to store a newly compiled query, lookups do not lock
+_compiled_lock = threading.Lock()
+
+
+def sql_cache_info() -> dict[str, int]:
+    """
+    Returns the hit and miss counters and the size of the compiled SQL cache.
+    """
+    return {**_compiled_stats, "size": len(_compiled_queries)}
+
+
+def clear_sql_cache() -> None:
+    with _compiled_lock:
+        _compiled_queries.clear()
+
+    _compiled_stats["hits"] = 0
+    _compiled_stats["misses"] = 0
+
+
+def result_cache_info() -> dict[str, int]:
+    """
+    Returns the hit, miss, eviction and invalidation counters and the size of
+    the result cache of the current Database.
+    """
+    return get_database().result_cache.info()
+
+
+def clear_result_cache() -> None:
+    get_database().result_cache.clear()
+
+
 class Query(t.Generic[MT, RT]):
+    """
+    Builder methods (`filter()`, `limit()`, ...) return a new Query and leave
+    the original unchanged, so a Query can be shared and extended by any
+    number of threads:
+
+        adults = Giraffe.query.filter(Giraffe.number > 5)
+        first_ten = adults.limit(10)
+
+    Queries of the same shape share their compiled SQL.
+    """
 
     def __init__(self, model: t.Type[MT]):
         self.model = model
@@ -31,8 +119,18 @@ class Query(t.Generic[MT, RT]):
 
         self.__offset = -1
         self.__limit = -1
-        self.__selected_fields: tuple[Field[t.Any], ...] | None = None
-        self.__date_field_cache: Date | None = None
+        self.__selected_fields: tuple[Field[t.Any] | Aggregate, ...] | None = None
+        self.__group_by: tuple[Field[t.Any], ...] = ()
+        self.__select_key: tuple[str, ...] | None = None
+        self.__where: Expression | None = None
+        self.__order_by: tuple[Ordering, ...] = ()
+        self.__order_key: tuple[tuple[str, bool], ...] = ()
+        self.__after: tuple[t.Any, ...] | None = None
+        self.__related: tuple[ForeignKey[t.Any], ...] = ()
+        self.__prefetch: tuple[ForeignKey[t.Any] | ReverseRelation[t.Any], ...] = ()
+
+        # Models may cache all their queries by default: `__cache_ttl__ = 30`
+        self._cache_ttl: float | None = getattr(model, "__cache_ttl__", None)
 
 
     def _build_select(self) -> str:
@@ -56,224 +154,1514 @@ class Query(t.Generic[MT, RT]):
         Generates a stringified format of what should be in the WHERE part of
         the database query.
         """
+        if self.__where is None: return ""
 
-        return ""
-    
+        return self.__where._compile()
+
+
+    def _build_group_by(self) -> str:
+        if not self.__group_by: return ""
+
+        return " GROUP BY " + ", ".join(field.get_name() for field in self.__group_by)
+
+
+    def _build_order_by(self) -> str:
+        orderings = self.__order_by
+
+        # The primary key tie breaker has no meaning for groups
+        if self.__group_by:
+            pk_name = self.model._primary_key.get_name()
+            grouped = [field.get_name() for field in self.__group_by]
+
+            orderings = tuple(ordering for ordering in orderings if ordering.field.get_name() != pk_name or pk_name in grouped)
+
+        if not orderings: return ""
+
+        return " ORDER BY " + ", ".join(ordering._compile() for ordering in orderings)
+
+
+    def _build_keyset(self) -> str:
+        """
+        Generates the predicate which only matches rows after the cursor 
+        position (see `after()`). A single direction compares row values, 
+        which SQLite can satisfy with an index on the ordered columns.
+        """
+        columns = [ordering.field.get_name() for ordering in self.__order_by]
+        descending = {ordering.descending for ordering in self.__order_by}
+
+        if len(descending) == 1:
+            operator = "<" if descending.pop() else ">"
+            if len(columns) == 1: return f"{columns[0]} {operator} ?"
+
+            return f"({', '.join(columns)}) {operator} ({', '.join('?' for _ in columns)})"
+
+        # Mixed directions: a > ? OR (a = ? AND b < ?) OR ...
+        clauses: list[str] = []
+
+        for i, ordering in enumerate(self.__order_by):
+            equal = [f"{column} = ?" for column in columns[:i]]
+            clauses.append("(" + " AND ".join([*equal, f"{columns[i]} {'<' if ordering.descending else '>'} ?"]) + ")")
+
+        return " OR ".join(clauses)
+
+
+    def _keyset_parameters(self) -> list[t.Any]:
+        """
+        The cursor values in the order of the placeholders of 
+        `_build_keyset()`.
+        """
+        values = t.cast(tuple[t.Any, ...], self.__after)
+        if len({ordering.descending for ordering in self.__order_by}) == 1: return list(values)
+
+        parameters: list[t.Any] = []
+
+        for i in range(len(values)):
+            parameters.extend(values[:i + 1])
+
+        return parameters
+
+
+    def _build_limit(self) -> tuple[str, tuple[str, ...]]:
+        """
+        Generates the LIMIT/OFFSET part of the database query. Values are bound
+        as parameters, so only their presence is part of the query shape.
+        """
+        if self.__offset > -1:
+            if self.__limit > -1:
+                return " LIMIT ? OFFSET ?", ("limit", "offset")
+
+            # SQLite does not support an OFFSET without a LIMIT
+            return " LIMIT -1 OFFSET ?", ("offset",)
+
+        if self.__limit > -1:
+            return " LIMIT ?", ("limit",)
+
+        return "", ()
+
+
+    def _compile(self, kind: str, extra: t.Hashable = None, payload: t.Any = None) -> CompiledQuery:
+        """
+        Returns the compiled SQL for the current shape of this query. The SQL 
+        is only built the first time a shape is seen. `extra` is part of the
+        shape, `payload` is only passed on to the builder.
+        """
+        key = (
+            self.model, kind, self._mode, self.__select_key, extra,
+            self.__where._shape() if self.__where is not None else None,
+            self.__limit > -1, self.__offset > -1,
+            self.__order_key, self.__after is not None,
+            tuple(field.get_name() for field in self.__group_by),
+            tuple(field.get_name() for field in self.__related),
+        )
 
-    def _query_one(self, query: str) -> RT | None:
-        result = query_one(query)
+        compiled = _compiled_queries.get(key)
+
+        if compiled is not None:
+            _compiled_stats["hits"] += 1
+            return compiled
+
+        _compiled_stats["misses"] += 1
+        compiled = self._build(kind, extra, payload)
+
+        with _compiled_lock:
+            if len(_compiled_queries) >= MAX_COMPILED_QUERIES:
+                _compiled_queries.pop(next(iter(_compiled_queries)), None)
+
+            _compiled_queries[key] = compiled
+        return compiled
+
+
+    def _build(self, kind: str, extra: t.Any, payload: t.Any) -> CompiledQuery:
+        tablename = self.model._cls_tablename()
+        where = self._build_where()
+        parameters = ("where",) if where else ()
+
+        if self.__after is not None:
+            keyset = self._build_keyset()
+            where = f"({where}) AND ({keyset})" if where else keyset
+            parameters += ("after",)
+
+        where = " WHERE " + where if where else ""
+
+        if kind == "update":
+            fields = ", ".join(f"{name} = {expression._compile()}" for name, expression in payload)
+            return CompiledQuery(f"UPDATE {tablename} SET {fields}{where};", parameters)
+
+        group_by = self._build_group_by()
+        order_by = self._build_order_by()
+        limit, limit_parameters = self._build_limit()
+
+        if kind == "delete":
+            if group_by: raise ValueError("Grouped rows cannot be deleted")
+            if not limit: return CompiledQuery(f"DELETE FROM {tablename}{where};", parameters)
+
+            # SQLite only supports DELETE ... LIMIT when compiled with it
+            pk_name = self.model._primary_key.get_name()
+            return CompiledQuery(f"DELETE FROM {tablename} WHERE {pk_name} IN (SELECT {pk_name} FROM {tablename}{where}{order_by}{limit});", parameters + limit_parameters)
+
+        # Rows limited or grouped before aggregating them are selected in a 
+        # subquery first
+        source = tablename + where
+        if limit or group_by: source = f"(SELECT * FROM {tablename}{where}{group_by}{order_by}{limit})"
+
+        if kind == "count":
+            return CompiledQuery(f"SELECT COUNT(*) FROM {source};", parameters + limit_parameters)
+
+        if kind == "exists":
+            return CompiledQuery(f"SELECT EXISTS (SELECT 1 FROM {tablename}{where}{group_by}{limit});", parameters + limit_parameters)
+
+        if kind == "aggregate":
+            if group_by: raise ValueError("Aggregate grouped rows with with_fields(...).group_by(...)")
+
+            aggregates = ", ".join(aggregate._compile() for aggregate in payload)
+            return CompiledQuery(f"SELECT {aggregates} FROM {source};", parameters + limit_parameters)
+
+        if self.__related and self._mode != QueryMode.MODEL:
+            raise ValueError("select_related() requires a query returning Model instances")
+
+        # Joined queries select every column in the inner query, so the join
+        # works whichever fields are loaded
+        select = f"SELECT {'*' if self.__related else self._build_select()} FROM {tablename}{where}{group_by}"
+
+        if kind == "first":
+            query, orderings = select + order_by + " LIMIT 1", self.__order_by
+
+        elif kind == "latest":
+            query, orderings = select + f" ORDER BY {extra} DESC LIMIT 1", ()
+
+        else:
+            query, orderings = select + order_by + limit, self.__order_by
+            parameters += limit_parameters
+
+        if self.__related: query = self._build_related(query, orderings)
+
+        return CompiledQuery(query + ";", parameters)
+
+
+    def _build_related(self, source: str, orderings: tuple[Ordering, ...]) -> str:
+        """
+        Joins the rows of source (this query without `select_related()`) 
+        with the rows their ForeignKeys reference. Rows hold the columns of 
+        this Model, followed by all columns of every related Model.
+        """
+        columns = [f"t.{name}" for name in self._loaded_names() or self.model._get_column_names()]
+        joins = ""
+
+        for i, field in enumerate(self.__related):
+            model = field.model
+            alias = f"r{i}"
+
+            columns.extend(f"{alias}.{name}" for name in model._get_column_names())
+            joins += f" LEFT JOIN {model._cls_tablename()} AS {alias} ON {alias}.{model._primary_key.get_name()} = t.{field.get_name()}"
+
+        order_by = " ORDER BY " + ", ".join(f"t.{ordering._compile()}" for ordering in orderings) if orderings else ""
+
+        return f"SELECT {', '.join(columns)} FROM ({source}) AS t{joins}{order_by}"
+
+
+    def _parameters(self, compiled: CompiledQuery, values: tuple[t.Any, ...] = ()) -> tuple[t.Any, ...]:
+        """
+        Binds the runtime values of this query to the parameter layout of the
+        compiled query.
+        """
+        if not compiled.parameters: return values
+
+        parameters = list(values)
+
+        for name in compiled.parameters:
+            if name == "where": t.cast(Expression, self.__where)._bind(parameters)
+            elif name == "limit": parameters.append(self.__limit)
+            elif name == "offset": parameters.append(self.__offset)
+            elif name == "after": parameters.extend(self._keyset_parameters())
+
+        return tuple(parameters)
+
+
+    def _cached(self, kind: str, query: str, parameters: tuple[t.Any, ...], fetch: t.Callable[[], R]) -> R:
+        """
+        Returns the cached result of the query, or fetches and caches it when
+        this query is cached (see `cached()`).
+        """
+        if self._cache_ttl is None: return fetch()
+
+        database = get_database()
+
+        # Transactions always read the live rows, including their own 
+        # uncommitted writes
+        if database._pinned() is not None: return fetch()
+
+        key = (kind, query, parameters)
+
+        try:
+            found, result = database.result_cache.get(key)
+
+        # Parameters which are not hashable cannot be cached
+        except TypeError:
+            return fetch()
+
+        if found: return result
+
+        result = fetch()
+        tables = _cascade_tables((self.model, *(field.model for field in self.__related)))
+        database.result_cache.set(key, tables, result, self._cache_ttl)
+
+        return result
+
+
+    def _query_one(self, query: str, parameters: tuple[t.Any, ...] = ()) -> RT | None:
+        result = self._cached("one", query, parameters, lambda: query_one(query, parameters, self.model))
 
         if not result: return None
         
         # Check whether the query is returning a model or plain row data
         if self._mode == QueryMode.MODEL:
-            instance = self.model._from_db(result)
+            instance = self._hydrate((result,))[0]
             return t.cast(RT, instance)
 
+        convert = self._row_converter()
+        if convert is not None: result = convert(result)
+
         return t.cast(RT, result) 
     
 
-    def _query_all(self, query: str) -> list[RT]:
-        results = query_all(query)
+    def _query_all(self, query: str, parameters: tuple[t.Any, ...] = ()) -> list[RT]:
+        results = self._cached("all", query, parameters, lambda: tuple(query_all(query, parameters, self.model)))
 
         if not results: return []
         
         # Check whether the query is returning a model or plain row data
         if self._mode == QueryMode.MODEL:
-            instances = [self.model._from_db(result) for result in results]
+            instances = self._hydrate(results)
             return t.cast(list[RT], instances)
 
-        return t.cast(list[RT], results) 
+        convert = self._row_converter()
+        if convert is not None: return t.cast(list[RT], list(map(convert, results)))
+
+        return t.cast(list[RT], list(results))
     
     
-    # TODO: TEMPORARY FIELD:
-    def create(self, **kwargs: dict[str, t.Any]) -> MT:
-        fields = ', '.join(kwargs.keys())
-        placeholders = ', '.join('?' for _ in kwargs)
-        values = tuple(kwargs.values())
-
-        last_id = change_db(
-            f"INSERT INTO {self.model._cls_tablename()} ({fields}) VALUES ({placeholders})",
-            values
-        )
+    def _iter_chunks(self, chunk_size: int) -> t.Iterator[list[RT]]:
+        compiled = self._compile("all")
+        chunks = query_chunks(compiled.sql, self._parameters(compiled), self.model, chunk_size)
 
-        if not last_id:
-            raise ValueError("Failed to create new entry")
+        if self._mode != QueryMode.MODEL:
+            convert = self._row_converter()
+            if convert is None: yield from t.cast(t.Iterator[list[RT]], chunks)
+            else: yield from (t.cast(list[RT], list(map(convert, rows))) for rows in chunks)
 
-        print("\tTODO: fix", last_id)
-        row = query_one(f"SELECT * FROM {self.model._cls_tablename()} WHERE rowid = ?", (last_id,))
-        return self.model._from_db(row)
-    
+            return
 
-    # --- Output modifiers ---
+        for rows in chunks:
+            yield t.cast(list[RT], self._hydrate(rows))
 
 
-    def filter(self) -> t.Self:
+    def _hydrate(self, rows: t.Sequence[tuple[t.Any, ...]]) -> list[MT]:
         """
-        Applies the provided filters to the WHERE clause of the query.
+        Turns rows into instances, together with their related instances 
+        (see `select_related()` and `prefetch_related()`).
         """
-        return self
+        names = self._loaded_names()
 
+        if not self.__related:
+            instances = self.model._from_rows(rows, names)
 
-    def limit(self, limit: int = 0) -> t.Self:
+        else:
+            width = len(names or self.model._get_column_names())
+            instances = self.model._from_rows([row[:width] for row in rows], names)
+
+            for field in self.__related:
+                width = self._hydrate_related(instances, rows, field, width)
+
+        for relation in self.__prefetch:
+            if isinstance(relation, ForeignKey): _prefetch_forward(instances, relation)
+            else: _prefetch_reverse(instances, relation)
+
+        return instances
+
+
+    def _hydrate_related(self, instances: list[MT], rows: t.Sequence[tuple[t.Any, ...]], field: ForeignKey[t.Any], start: int) -> int:
         """
-        Applies a limit to this query.
+        Hydrates the related instances of field from the columns of rows 
+        starting at start, every row is hydrated once. Returns where the 
+        columns of the next related Model start.
         """
-        if limit < 0: raise ValueError(f"Invalid offset {limit}, must be greater than 0")
+        model = field.model
+        end = start + len(model._get_column_names())
+        pk_index = start + model._pk_index
 
-        self.__limit = limit
-        return self
+        related_rows: dict[t.Any, tuple[t.Any, ...]] = {}
 
+        for row in rows:
+            pk = row[pk_index]
+            if pk is not None and pk not in related_rows: related_rows[pk] = row[start:end]
 
-    def load_fields(self, *fields: Field[t.Any]) -> t.Self:
+        related = dict(zip(related_rows, model._from_rows(related_rows.values())))
+
+        for instance, row in zip(instances, rows):
+            instance._set_related(field.name, related.get(row[pk_index]))
+
+        return end
+
+
+    def _row_converter(self) -> t.Callable[[tuple[t.Any, ...]], tuple[t.Any, ...]] | None:
         """
-        This query will return (an) instance(s) of this Model with only the 
-        provided fields loaded from the database.
+        Converts the values of the selected fields in rows as stored (see 
+        `with_fields()`), the values of aggregates are returned as stored.
         """
-        self._mode = QueryMode.MODEL
-        self.__selected_fields = fields
+        fields = self.__selected_fields or ()
+        return row_converter([field.type if isinstance(field, Field) else None for field in fields])
 
-        return self
-    
 
-    def offset(self, offset: int = 0) -> t.Self:
+    def _loaded_names(self) -> tuple[str, ...] | None:
         """
-        Applies an offset to this query.
+        The fields selected by `load_fields()`, in the order of the columns.
         """
-        if offset < 0: raise ValueError(f"Invalid offset {offset}, must be greater than 0")
+        if not self.__selected_fields: return None
 
-        self.__offset = offset
-        return self
+        return tuple(field.get_name() for field in self.__selected_fields)
 
-    
-    @t.overload
-    def with_fields(self, __f1: Field[T1]) -> "Query[MT, tuple[T1]]": ...
-    @t.overload
-    def with_fields(self, *fields: Field[t.Any]) -> "Query[MT, tuple[t.Any, ...]]": ...
-    def with_fields(self, *fields: Field[t.Any]) -> "Query[MT, tuple[t.Any, ...]]":
+
+    def _related_values(self, values: dict[str, t.Any]) -> dict[str, t.Any]:
         """
-        This query will return (a) tuple(s) with only the provided fields 
-        loaded from the database.
+        Replaces related instances in values by their primary key, and adapts
+        the values of fields such as Json (see `Field._to_db()`).
         """
-        self._mode = QueryMode.ROWS
-        self.__selected_fields = fields
+        for field in self.model._foreign_keys:
+            if field.name in values: values[field.name] = field._to_pk(values[field.name])
 
-        new_query = t.cast(t.Any, self)
-        return new_query
-    
+        return self.model._adapt_values(values)
 
-    # --- Terminal methods ---
 
-    def all(self) -> list[RT]:
+    def _clone(self) -> t.Self:
         """
-        Get all elements satisfying the query.
+        Returns a copy to apply a builder method to. All state is immutable
+        (tuples, expressions) so the copy shares it.
         """
+        query = object.__new__(type(self))
+        query.__dict__.update(self.__dict__)
 
-        query = \
-        f"""
-        SELECT {self._build_select()}
-        FROM {self.model._cls_tablename()}
-        """
+        return query
 
-        if self.__limit > -1:
-            query += f"LIMIT {self.__limit}"
 
-        if self.__offset > -1:
-            query += f" OFFSET {self.__offset}"
-        
-        return self._query_all(query)
+    def _insert_statement(self, columns: t.Iterable[str], rows: int = 1) -> str:
+        tablename = self.model._cls_tablename()
+        columns = tuple(columns)
 
+        if not columns: return f"INSERT INTO {tablename} DEFAULT VALUES"
 
-    def first(self) -> RT | None:
+        values = f"({', '.join('?' for _ in columns)})"
+        return f"INSERT INTO {tablename} ({', '.join(columns)}) VALUES {', '.join([values] * rows)}"
+
+
+    # TODO: TEMPORARY FIELD:
+    def create(self, **kwargs: dict[str, t.Any]) -> MT:
+        kwargs = self._related_values(kwargs)
+        insert = self._insert_statement(kwargs.keys())
+        values = tuple(kwargs.values())
+        column_names = ", ".join(self.model._get_column_names())
+
+        # Hydrate straight from the inserted row, this also works for tables
+        # whose primary key is not the rowid.
+        if SUPPORTS_RETURNING:
+            rows = change_returning(f"{insert} RETURNING {column_names}", values, self.model)
+
+            if not rows:
+                raise ValueError("Failed to create new entry")
+
+            return self.model._from_db(rows[0])
+
+        last_id = change_db(insert, values, self.model)
+
+        if not last_id:
+            raise ValueError("Failed to create new entry")
+
+        row = query_one(f"SELECT {column_names} FROM {self.model._cls_tablename()} WHERE rowid = ?", (last_id,), self.model)
+        return self.model._from_db(row)
+
+
+    def _insert_rows(self, rows: t.Iterable[MT | dict[str, t.Any]]) -> t.Iterator[tuple[MT | None, tuple[str, ...], tuple[t.Any, ...]]]:
         """
-        Get the first element (or None) satisfying the query.
+        Yields the instance (if any), columns and values to insert for every 
+        provided Model instance or dictionary.
         """
+        column_names = self.model._get_column_names()
+
+        for row in rows:
+            if not isinstance(row, dict):
+                yield (row, *row._insert_values())
+                continue
 
-        query = \
-        f"""
-        SELECT {self._build_select()}
-        FROM {self.model._cls_tablename()}
-        LIMIT 1;
+            for name in row:
+                if name not in column_names:
+                    raise ValueError(f"Unknown field '{name}' for {self.model.__name__}")
+
+            if self.model._foreign_keys or self.model._adapted_fields: row = self._related_values(dict(row))
+            yield None, tuple(row.keys()), tuple(row.values())
+
+
+    def _insert_batches(self, rows: t.Iterable[MT | dict[str, t.Any]], statement: t.Callable[[tuple[str, ...]], str], batch_size: int, inserted: list[MT]) -> t.Iterator[tuple[str, list[tuple[t.Any, ...]]]]:
+        """
+        Groups the rows to insert by their set of columns, and yields the 
+        statement and rows of every group each `batch_size` rows. Provided 
+        instances are collected in inserted, to be marked as saved once the 
+        transaction committed.
         """
+        groups: dict[tuple[str, ...], list[tuple[t.Any, ...]]] = {}
+        buffered = 0
+
+        for instance, columns, values in self._insert_rows(rows):
+            groups.setdefault(columns, []).append(values)
+            buffered += 1
+
+            if instance is not None: inserted.append(instance)
+            if buffered < batch_size: continue
+
+            yield from ((statement(columns), values) for columns, values in groups.items())
+
+            groups = {}
+            buffered = 0
+
+        yield from ((statement(columns), values) for columns, values in groups.items())
 
-        return self._query_one(query)
 
     @t.overload
-    def latest(self) -> RT | None: ...
-    @t.overload
-    def latest(self, date_field: str) -> RT | None: ...
+    def bulk_create(self, rows: t.Iterable[MT | dict[str, t.Any]], batch_size: int = ..., return_pks: t.Literal[False] = ...) -> int: ...
     @t.overload
-    def latest(self, date_field: Field[datetime]) -> RT | None: ...
-    def latest(self, date_field: str | Field[datetime] | None = None) -> RT | None:
+    def bulk_create(self, rows: t.Iterable[MT | dict[str, t.Any]], batch_size: int = ..., *, return_pks: t.Literal[True]) -> list[t.Any]: ...
+    def bulk_create(self, rows: t.Iterable[MT | dict[str, t.Any]], batch_size: int = DEFAULT_BATCH_SIZE, return_pks: bool = False) -> int | list[t.Any]:
         """
-        Get last table row based on Date fields. If no explicit field provided
-        the first field of type Date will be used. Takes in a Field[datetime] 
-        (or) string.
+        Inserts many Model instances and/or dictionaries in a single 
+        transaction. Rows are grouped by their set of columns and inserted 
+        with `executemany`, `batch_size` rows at a time. Provided instances 
+        get their inserted row (e.g. the primary key assigned by the 
+        database) with multi-row `INSERT ... RETURNING` statements. Returns 
+        the number of inserted rows, or with `return_pks` the primary key of 
+        every row (in order).
         """
+        if batch_size < 1: raise ValueError(f"Invalid batch_size {batch_size}, must be at least 1")
 
-        # Overwrite cache with explicit lookups for override 1 (field by str),
-        # override 2 (field by Field[datetime]) and lastly (if no cache value 
-        # is known) by finding the first field of type Date of the model.
+        pk_name = self.model._primary_key.get_name()
+        statements: dict[tuple[str, ...], str] = {}
 
-        if isinstance(date_field, str):
-            self.__date_field_cache = getattr(self.model, date_field, None)
+        def statement(columns: tuple[str, ...]) -> str:
+            if columns not in statements:
+                statements[columns] = self._insert_statement(columns)
 
-        # Internally Field[datetime] does not exist and will always be a Date field
-        elif isinstance(date_field, Date):
-            self.__date_field_cache = date_field
+            return statements[columns]
 
-        elif not self.__date_field_cache:
-            try:
-                self.__date_field_cache = next(self.model._fields_of_type(Date))
-            
-            except StopIteration:
-                raise ValueError("Could not find any date fields.")
+        if return_pks:
+            inserts = list(self._insert_rows(rows))
 
-        # If still no correct field is known, return an error.
-        if not self.__date_field_cache:
-            if not date_field:
-                raise ValueError(f"Could not find any date fields.")
-            
-            raise ValueError(f"Date Field '{date_field}' not found on model.")
-        
-        field_name = self.__date_field_cache.get_name()
-        query = \
-        f"""
-        SELECT {self._build_select()}
-        FROM {self.model._cls_tablename()}
-        ORDER BY {field_name} DESC
-        LIMIT 1;
+            if SUPPORTS_RETURNING:
+                # The rows of every batch are inserted per set of columns with
+                # multi-row INSERT ... RETURNING statements, which return the
+                # rows in the order of their VALUES
+                order: list[int] = []
+                returned = insert_many(self._returning_batches(inserts, batch_size, order), self.model)
+                pks: list[t.Any] = [None] * len(inserts)
+
+                for i, row in zip(order, returned):
+                    instance = inserts[i][0]
+                    if instance is not None: instance._set_row(row)
+
+                    pks[i] = row[self.model._pk_index]
+
+                return pks
+
+            # Without RETURNING the row id is only known per statement, so 
+            # every row is executed on its own (still within the single 
+            # transaction)
+            pks = []
+            row_ids = insert_many(((statement(columns), values) for _, columns, values in inserts), self.model)
+
+            for (instance, columns, values), row_id in zip(inserts, row_ids):
+                pk = values[columns.index(pk_name)] if pk_name in columns else row_id
+                if instance is not None: instance._set_persisted(pk)
+
+                pks.append(pk)
+
+            return pks
+
+        if not SUPPORTS_RETURNING:
+            inserted: list[MT] = []
+            row_count = change_many(self._insert_batches(rows, statement, batch_size, inserted), self.model)
+
+            self._set_inserted(inserted)
+            return row_count
+
+        # Batches with instances get their inserted rows back (the primary 
+        # key and database evaluated defaults), batches of only dictionaries
+        # are inserted with executemany
+        returned: list[tuple[MT, tuple[t.Any, ...]]] = []
+        row_count = 0
+        rows = iter(rows)
+
+        with get_database().transaction():
+            while batch := list(itertools.islice(rows, batch_size)):
+                inserts = list(self._insert_rows(batch))
+
+                if all(instance is None for instance, _, _ in inserts):
+                    groups: dict[tuple[str, ...], list[tuple[t.Any, ...]]] = {}
+                    for _, columns, values in inserts: groups.setdefault(columns, []).append(values)
+
+                    row_count += change_many(((statement(columns), values) for columns, values in groups.items()), self.model)
+                    continue
+
+                order: list[int] = []
+
+                for i, row in zip(order, insert_many(self._returning_batches(inserts, batch_size, order), self.model)):
+                    instance = inserts[i][0]
+                    if instance is not None: returned.append((instance, row))
+
+                row_count += len(inserts)
+
+        # Only mark the instances as saved once the transaction committed
+        for instance, row in returned:
+            instance._set_row(row)
+
+        return row_count
+
+
+    def _set_inserted(self, instances: list[MT]) -> None:
+        """
+        Marks instances inserted without their rows being returned as saved, 
+        once the transaction committed. Those without a primary key stay 
+        unsaved, their key is not known (see `bulk_create(return_pks=True)`).
         """
+        pk_name = self.model._primary_key.name
 
-        return self._query_one(query)
+        for instance in instances:
+            if instance._data.get(pk_name) is not None: instance._set_persisted()
 
 
-    def update(self, changes: dict[Field[t.Any], t.Any]) -> None:
+    def _returning_batches(self, inserts: list[tuple[MT | None, tuple[str, ...], tuple[t.Any, ...]]], batch_size: int, order: list[int]) -> t.Iterator[tuple[str, tuple[t.Any, ...]]]:
         """
-        Will update the provided fields with the provided values for all 
-        selected fields.
+        Yields a multi-row INSERT ... RETURNING statement and its values per 
+        set of columns of every `batch_size` inserts, appending the positions
+        of the inserted rows to order.
         """
+        returning = f" RETURNING {', '.join(self.model._get_column_names())}"
 
-        fields: str = ""
-        values: list[t.Any] = []
+        for start in range(0, len(inserts), batch_size):
+            groups: dict[tuple[str, ...], list[int]] = {}
 
-        for field, value in changes.items():
-            if not isinstance(value, dict):
-                fields += field.get_name() + " = ?, "
-                values.append(value)
-                continue
+            for i in range(start, min(start + batch_size, len(inserts))):
+                groups.setdefault(inserts[i][1], []).append(i)
 
-            value = t.cast(Clause, value)
+            for columns, positions in groups.items():
+                # DEFAULT VALUES inserts a single row
+                step = MAX_VARIABLES // len(columns) if columns else 1
 
-            fields += f"{field.get_name()} = {value['lhs']} ?, "
-            values.append(value["rhs"])
+                for offset in range(0, len(positions), step):
+                    chunk = positions[offset:offset + step]
+                    order.extend(chunk)
 
-        where = self._build_where()
-        query = \
-        f"""
-        UPDATE {self.model._cls_tablename()}
-        SET {fields[:-2]}
-        {"WHERE " + where if where else ""};
+                    yield self._insert_statement(columns, len(chunk)) + returning, tuple(value for i in chunk for value in inserts[i][2])
+
+
+    def _delete_pks(self, pks: t.Iterable[t.Any], batch_size: int = DEFAULT_DELETE_BATCH_SIZE) -> int:
+        """
+        Deletes the rows with the provided primary keys, using one 
+        `DELETE ... WHERE pk IN (...)` per `batch_size` keys.
+        """
+        tablename = self.model._cls_tablename()
+        pk_name = self.model._primary_key.get_name()
+
+        def batches() -> t.Iterator[tuple[str, list[tuple[t.Any, ...]]]]:
+            batch: list[t.Any] = []
+
+            for pk in pks:
+                batch.append(pk)
+                if len(batch) < batch_size: continue
+
+                yield f"DELETE FROM {tablename} WHERE {pk_name} IN ({', '.join('?' for _ in batch)})", [tuple(batch)]
+                batch = []
+
+            if batch:
+                yield f"DELETE FROM {tablename} WHERE {pk_name} IN ({', '.join('?' for _ in batch)})", [tuple(batch)]
+
+        return change_many(batches(), self.model)
+
+
+    def bulk_update(self, instances: t.Iterable[MT], fields: t.Iterable[Field[t.Any] | str] | None = None, batch_size: int = DEFAULT_BATCH_SIZE) -> int:
         """
+        Saves the changes of many instances in a single transaction. Instances
+        are grouped by their set of changed fields (optionally limited to 
+        fields) and updated with `executemany`, `batch_size` instances at a 
+        time. Returns the number of updated rows.
+        """
+        if batch_size < 1: raise ValueError(f"Invalid batch_size {batch_size}, must be at least 1")
+
+        names = None if fields is None else {field if isinstance(field, str) else field.get_name() for field in fields}
+        tablename = self.model._cls_tablename()
+        pk_name = self.model._primary_key.get_name()
+        updated: list[tuple[MT, tuple[str, ...]]] = []
+
+        def batches() -> t.Iterator[tuple[str, list[tuple[t.Any, ...]]]]:
+            groups: dict[tuple[str, ...], list[tuple[t.Any, ...]]] = {}
+            buffered = 0
+
+            for instance in instances:
+                changes = instance._get_changes(names)
+                if not changes: continue
+
+                columns = tuple(changes.keys())
+                groups.setdefault(columns, []).append((*changes.values(), instance._original_data[pk_name]))
+                updated.append((instance, columns))
+
+                buffered += 1
+                if buffered < batch_size: continue
+
+                yield from ((f"UPDATE {tablename} SET {' = ?, '.join(columns)} = ? WHERE {pk_name} = ?", rows) for columns, rows in groups.items())
+
+                groups = {}
+                buffered = 0
+
+            yield from ((f"UPDATE {tablename} SET {' = ?, '.join(columns)} = ? WHERE {pk_name} = ?", rows) for columns, rows in groups.items())
+
+        row_count = change_many(batches(), self.model)
+
+        # Only mark the instances as saved once the transaction committed
+        for instance, columns in updated:
+            instance._set_persisted(names=columns)
+
+        return row_count
+
+
+    def upsert(
+            self, 
+            rows: t.Iterable[MT | dict[str, t.Any]], 
+            conflict_fields: t.Iterable[Field[t.Any] | str], 
+            update_fields: t.Iterable[Field[t.Any] | str] | None = None, 
+            batch_size: int = DEFAULT_BATCH_SIZE
+        ) -> int:
+        """
+        Inserts many Model instances and/or dictionaries, rows which conflict
+        with an existing row on conflict_fields (the primary key or a unique
+        index) update that row instead:
+
+            Giraffe.query.upsert(rows, conflict_fields=[Giraffe.primary_key], update_fields=[Giraffe.number])
+
+        Without update_fields all inserted columns except conflict_fields are
+        updated, with an empty update_fields existing rows are kept as they 
+        are. Like `bulk_create()` rows are inserted in a single transaction 
+        with `executemany`. Returns the number of inserted and updated rows.
+        """
+        if batch_size < 1: raise ValueError(f"Invalid batch_size {batch_size}, must be at least 1")
+
+        conflict = tuple(field if isinstance(field, str) else field.get_name() for field in conflict_fields)
+        if not conflict: raise ValueError("Upserting requires at least one conflict field")
+
+        update = None if update_fields is None else tuple(field if isinstance(field, str) else field.get_name() for field in update_fields)
+        statements: dict[tuple[str, ...], str] = {}
+
+        def statement(columns: tuple[str, ...]) -> str:
+            if columns in statements: return statements[columns]
+
+            updated = [column for column in (columns if update is None else update) if column in columns and column not in conflict]
+            action = "DO UPDATE SET " + ", ".join(f"{column} = excluded.{column}" for column in updated) if updated else "DO NOTHING"
+
+            statements[columns] = f"{self._insert_statement(columns)} ON CONFLICT ({', '.join(conflict)}) {action}"
+            return statements[columns]
+
+        inserted: list[MT] = []
+        row_count = change_many(self._insert_batches(rows, statement, batch_size, inserted), self.model)
+
+        # Which existing rows were updated is not known, none of the loaded 
+        # instances of the Model may be returned by the active IdentityMap
+        identity_map = current_identity_map()
+        if identity_map is not None: identity_map.evict(self.model)
+
+        self._set_inserted(inserted)
+        return row_count
+    
+
+    # --- Output modifiers ---
+
+
+    def filter(self, *expressions: Expression) -> t.Self:
+        """
+        Applies the provided filters to the WHERE clause of the query. All 
+        filters (also those of earlier calls) have to match:
+
+            Giraffe.query.filter(Giraffe.number > 5, Giraffe.date.is_null())
+        """
+        if not expressions: return self
+
+        if self.__where is not None:
+            expressions = (self.__where, *expressions)
+
+        query = self._clone()
+        query.__where = expressions[0] if len(expressions) == 1 else and_(*expressions)
+        return query
+
+
+    def cached(self, ttl: float = DEFAULT_TTL) -> t.Self:
+        """
+        Results of this query are cached for ttl seconds, or until the table
+        is written through the Database. Streaming with `iter()` is never 
+        cached.
+        """
+        if ttl <= 0: raise ValueError(f"Invalid ttl {ttl}, must be greater than 0")
+
+        query = self._clone()
+        query._cache_ttl = ttl
+        return query
+
+
+    def uncached(self) -> t.Self:
+        """
+        Results of this query are always read from the database.
+        """
+        query = self._clone()
+        query._cache_ttl = None
+        return query
+
+
+    def limit(self, limit: int = 0) -> t.Self:
+        """
+        Applies a limit to this query.
+        """
+        if limit < 0: raise ValueError(f"Invalid offset {limit}, must be greater than 0")
+
+        query = self._clone()
+        query.__limit = limit
+        return query
+
+
+    def load_fields(self, *fields: Field[t.Any]) -> t.Self:
+        """
+        This query will return (an) instance(s) of this Model with only the 
+        provided fields (and the primary key) loaded from the database. The 
+        other fields are loaded on first access, for all instances of the 
+        query at once:
+
+            for giraffe in Giraffe.query.load_fields(Giraffe.number):
+                giraffe.description     # one query for all giraffes
+        """
+        pk = self.model._primary_key
+
+        if fields and not any(field.get_name() == pk.get_name() for field in fields):
+            fields = (pk, *fields)
+
+        query = self._clone()
+        query._mode = QueryMode.MODEL
+        query.__selected_fields = fields
+        query.__select_key = tuple(field._select() for field in fields) or None
+
+        return query
+    
+
+    def order_by(self, *orderings: Field[t.Any] | Ordering) -> t.Self:
+        """
+        Orders the results by the provided fields, ascending unless provided
+        as `Field.desc()`. The primary key is appended as final tie breaker,
+        so the order is total:
+
+            Giraffe.query.order_by(Giraffe.date.desc(), Giraffe.number)
+        """
+        normalized = tuple(ordering if isinstance(ordering, Ordering) else ordering.asc() for ordering in orderings)
+        pk_name = self.model._primary_key.get_name()
+
+        if normalized and not any(ordering.field.get_name() == pk_name for ordering in normalized):
+            normalized += (Ordering(self.model._primary_key, normalized[-1].descending),)
+
+        query = self._clone()
+        query.__order_by = normalized
+        query.__order_key = tuple((ordering.field.get_name(), ordering.descending) for ordering in normalized)
+        query.__after = None
+
+        return query
+
+
+    def after(self, cursor: str | None) -> t.Self:
+        """
+        Only returns the rows after the cursor (see `page()` and `cursor()`)
+        of a previous page. Unlike `offset()` this filters on the ordered 
+        columns, so every page costs the same no matter how deep it is:
+
+            page = Giraffe.query.order_by(Giraffe.date.desc()).page(50)
+            page = Giraffe.query.order_by(Giraffe.date.desc()).after(page.next_cursor).page(50)
+
+        The ordered columns should not contain NULL values.
+        """
+        query = self._clone()
+
+        if cursor is None:
+            query.__after = None
+            return query
+
+        if not self.__order_by: raise ValueError("Keyset pagination requires order_by()")
+
+        names, values = _decode_cursor(cursor)
+
+        if names != [name for name, _ in self.__order_key]:
+            raise ValueError("Cursor does not match the order of this query")
+
+        query.__after = tuple(values)
+        return query
+
+
+    def cursor(self, item: RT) -> str:
+        """
+        Returns the opaque cursor positioned at item, a result of this query.
+        """
+        if not self.__order_by: raise ValueError("Keyset pagination requires order_by()")
+
+        names = [name for name, _ in self.__order_key]
+
+        if self._mode == QueryMode.MODEL:
+            # Fields deferred by `load_fields()` are loaded (for all instances
+            # of the query at once)
+            instance = t.cast('Model', item)
+            return _encode_cursor(names, [instance._data[name] if name in instance._data else instance._load_field(name, None) for name in names])
+
+        selected = [field.get_name() for field in self.__selected_fields or ()]
+        row = t.cast(tuple[t.Any, ...], item)
+
+        try:
+            return _encode_cursor(names, [row[selected.index(name)] for name in names])
+
+        except ValueError:
+            raise ValueError("All ordered fields must be selected to create a cursor")
+
+
+    def select_related(self, *fields: ForeignKey[t.Any]) -> t.Self:
+        """
+        Loads the instances the provided ForeignKeys reference in the same 
+        query, through a JOIN:
+
+            for giraffe in Giraffe.query.select_related(Giraffe.zoo):
+                giraffe.zoo.name    # no query
+        """
+        for field in fields:
+            if field not in self.model._foreign_keys:
+                raise ValueError(f"{field.name} is not a ForeignKey of {self.model.__name__}")
+
+        query = self._clone()
+        query.__related = fields
+        return query
+
+
+    def prefetch_related(self, *relations: ForeignKey[t.Any] | ReverseRelation[t.Any]) -> t.Self:
+        """
+        Loads the related instances of ForeignKeys or ReverseRelations with 
+        one query per relation (and per 500 instances) after the results:
+
+            for zoo in Zoo.query.prefetch_related(Zoo.giraffes):
+                zoo.giraffes        # no query
+        """
+        for relation in relations:
+            if isinstance(relation, ForeignKey) and relation not in self.model._foreign_keys:
+                raise ValueError(f"{relation.name} is not a ForeignKey of {self.model.__name__}")
+
+            if isinstance(relation, ReverseRelation) and relation.foreign_key.model is not self.model:
+                raise ValueError(f"{relation.name} is not a relation of {self.model.__name__}")
+
+        query = self._clone()
+        query.__prefetch = relations
+        return query
+
+
+    def group_by(self, *fields: Field[t.Any]) -> "Query[MT, tuple[t.Any, ...]]":
+        """
+        Groups the rows by the provided fields, this query will return 
+        tuples. Without `with_fields()` the grouped fields are selected:
+
+            Giraffe.query.with_fields(Giraffe.number, Giraffe.date.max()).group_by(Giraffe.number)
+        """
+        query = self._clone()
+        query._mode = QueryMode.ROWS
+        query.__group_by = fields
+
+        if not self.__selected_fields:
+            query.__selected_fields = fields
+            query.__select_key = tuple(field._select() for field in fields) or None
+
+        new_query = t.cast(t.Any, query)
+        return new_query
+
+
+    def offset(self, offset: int = 0) -> t.Self:
+        """
+        Applies an offset to this query.
+        """
+        if offset < 0: raise ValueError(f"Invalid offset {offset}, must be greater than 0")
+
+        query = self._clone()
+        query.__offset = offset
+        return query
+
+    
+    @t.overload
+    def with_fields(self, __f1: Field[T1]) -> "Query[MT, tuple[T1]]": ...
+    @t.overload
+    def with_fields(self, *fields: Field[t.Any] | Aggregate) -> "Query[MT, tuple[t.Any, ...]]": ...
+    def with_fields(self, *fields: Field[t.Any] | Aggregate) -> "Query[MT, tuple[t.Any, ...]]":
+        """
+        This query will return (a) tuple(s) with only the provided fields 
+        loaded from the database. Aggregates (e.g. `Giraffe.number.sum()`) 
+        can be selected as well, see `group_by()`.
+        """
+        query = self._clone()
+        query._mode = QueryMode.ROWS
+        query.__selected_fields = fields
+        query.__select_key = tuple(field._select() for field in fields) or None
+
+        new_query = t.cast(t.Any, query)
+        return new_query
+    
+
+    def __getitem__(self, key: slice | int) -> t.Any:
+        """
+        Slicing maps onto LIMIT/OFFSET and returns a new query, indexing
+        returns the element at that position:
+
+            Giraffe.query[10:20].all()
+            Giraffe.query[3]
+        """
+        if isinstance(key, int):
+            if key < 0: raise IndexError("Negative indexing is not supported")
+
+            for result in self[key:key + 1]:
+                return result
+
+            raise IndexError("Query index out of range")
+
+        if key.step is not None: raise ValueError("Slicing with a step is not supported")
+
+        start = key.start or 0
+        if start < 0 or (key.stop is not None and key.stop < 0):
+            raise ValueError("Negative slicing is not supported")
+
+        # Slices are relative to an already applied offset and limit
+        offset = max(self.__offset, 0) + start
+        limit = self.__limit
+
+        if key.stop is not None:
+            stop = max(key.stop - start, 0)
+            limit = stop if limit < 0 else min(stop, max(limit - start, 0))
+
+        elif limit > -1:
+            limit = max(limit - start, 0)
+
+        query = self._clone()
+        query.__offset = offset if offset else -1
+        query.__limit = limit
+
+        return query
+
+
+    # --- Terminal methods ---
+
+    def __iter__(self) -> t.Iterator[RT]:
+        return self.iter()
+
+
+    def iter(self, chunk_size: int = DEFAULT_CHUNK_SIZE) -> t.Iterator[RT]:
+        """
+        Lazily iterate over all elements satisfying the query. Rows are 
+        fetched and hydrated `chunk_size` at a time, so memory usage does not
+        grow with the size of the result. A connection of the pool stays 
+        checked out until the iteration ends, rows can only be written 
+        meanwhile in WAL mode (see `Database`).
+        """
+        for chunk in self._iter_chunks(chunk_size):
+            yield from chunk
+
+
+    def all(self) -> list[RT]:
+        """
+        Get all elements satisfying the query.
+        """
+        compiled = self._compile("all")
+
+        return self._query_all(compiled.sql, self._parameters(compiled))
+
+
+    def page(self, size: int) -> Page[RT]:
+        """
+        Get the next `size` elements of an ordered query (see `after()`), 
+        together with the cursor of the following page.
+        """
+        if size < 1: raise ValueError(f"Invalid size {size}, must be at least 1")
+        if not self.__order_by: raise ValueError("Keyset pagination requires order_by()")
+
+        # The ordered fields are loaded with the page, even when not selected
+        # by `load_fields()`, the cursor is made of their values
+        query = self._clone()
+
+        if self._mode == QueryMode.MODEL and self.__selected_fields:
+            selected = {field.get_name() for field in self.__selected_fields}
+            missing = [ordering.field for ordering in self.__order_by if ordering.field.get_name() not in selected]
+
+            if missing: query = query.load_fields(*t.cast(tuple[Field[t.Any], ...], self.__selected_fields), *missing)
+
+        # One extra row tells whether there is a next page
+        query.__limit = size + 1
+
+        items = query.all()
+        if len(items) <= size: return Page(items, None)
+
+        return Page(items[:size], self.cursor(items[size - 1]))
+
+
+    def get(self, pk: t.Any) -> MT | None:
+        """
+        Get the instance (or None) with the provided primary key. Inside an
+        IdentityMap (e.g. a Session) an instance which is already loaded is
+        returned without querying the database. The filters of this query 
+        are not applied.
+        """
+        identity_map = current_identity_map()
+
+        if identity_map is not None:
+            instance = identity_map.get(self.model, pk)
+            if instance is not None: return instance
+
+        query: Query[MT, MT] = Query(self.model)
+        return query.filter(self.model._primary_key == pk).first()
+
+
+    def first(self) -> RT | None:
+        """
+        Get the first element (or None) satisfying the query.
+        """
+        compiled = self._compile("first")
+
+        return self._query_one(compiled.sql, self._parameters(compiled))
+
+
+    def count(self) -> int:
+        """
+        Count the number of rows satisfying the filters of the query, within
+        its limit and offset. Grouped queries count their groups.
+        """
+        compiled = self._compile("count")
+        parameters = self._parameters(compiled)
+
+        return self._cached("one", compiled.sql, parameters, lambda: query_one(compiled.sql, parameters, self.model))[0]
+
+
+    def exists(self) -> bool:
+        """
+        Whether any row satisfies the query, without loading it.
+        """
+        compiled = self._compile("exists")
+        parameters = self._parameters(compiled)
+
+        return bool(self._cached("one", compiled.sql, parameters, lambda: query_one(compiled.sql, parameters, self.model))[0])
+
+
+    def aggregate(self, **aggregates: Field[t.Any] | Aggregate) -> dict[str, t.Any]:
+        """
+        Computes aggregates over the rows satisfying the query (respecting 
+        limit and offset) in a single statement. Keys are sum, avg, min, max
+        or count with a Field, or any name with an aggregate:
+
+            Giraffe.query.aggregate(sum=Giraffe.number, oldest=Giraffe.date.min())
+        """
+        if not aggregates: raise ValueError("No aggregates provided")
+
+        expressions: list[Aggregate] = []
+
+        for name, value in aggregates.items():
+            if isinstance(value, Field):
+                if name not in AGGREGATES:
+                    raise ValueError(f"Unknown aggregate '{name}', use {', '.join(AGGREGATES)} or an aggregate such as Field.sum()")
+
+                value = Aggregate(t.cast(t.Any, name.upper()), Column(value))
+
+            expressions.append(value)
+
+        compiled = self._compile("aggregate", tuple(expression._shape() for expression in expressions), expressions)
+        parameters = self._parameters(compiled)
+
+        row = self._cached("one", compiled.sql, parameters, lambda: query_one(compiled.sql, parameters, self.model))
+        return dict(zip(aggregates, row))
+
+
+    def columns(self, chunk_size: int = DEFAULT_CHUNK_SIZE, numpy: bool = False) -> dict[str, t.Any]:
+        """
+        Returns the selected fields (see `with_fields()`, all fields by 
+        default) as one column per field, keyed by name or label:
+
+            columns = Giraffe.query.with_fields(Giraffe.number, Giraffe.weight).columns()
+            statistics.fmean(columns["weight"])
+
+        Integer, Boolean and Float columns (and their aggregates) are compact
+        `array.array`s, other columns and integer columns holding NULL are 
+        lists (NULL floats are NaN). Rows are fetched and moved into the 
+        columns `chunk_size` at a time. With numpy, the columns are returned
+        as NumPy arrays, without copying the `array.array`s.
+        """
+        fields = self.__selected_fields or tuple(self.model._fields)
+
+        query = self.with_fields(*fields)
+        query.__related = ()
+        query.__prefetch = ()
+
+        compiled = query._compile("all")
+        chunks = query_chunks(compiled.sql, query._parameters(compiled), self.model, chunk_size)
+        columns: list[array[t.Any] | list[t.Any]] = [array(field._typecode) if field._typecode else [] for field in fields]
+        convert = query._row_converter()
+
+        for rows in chunks:
+            if convert is not None: rows = list(map(convert, rows))
+
+            for i, values in enumerate(zip(*rows)):
+                _extend_column(columns, i, values)
+
+        names = [field.get_label() if isinstance(field, Field) else field.get_name() for field in fields]
+        if not numpy: return dict(zip(names, columns))
+
+        # NumPy is optional, and not a dependency type checking can resolve
+        try:
+            np: t.Any = importlib.import_module("numpy")
+
+        except ImportError:
+            raise ImportError("Query.columns(numpy=True) requires NumPy to be installed")
+
+        return {
+            name: np.frombuffer(column, dtype=column.typecode) if isinstance(column, array) else np.array(column)
+            for name, column in zip(names, columns)
+        }
+
+
+    def _date_field(self, date_field: str | Field[datetime] | None) -> str:
+        """
+        Resolves the name of the Date field `latest()` orders by.
+        """
+        # Overwrite cache with explicit lookups for override 1 (field by str),
+        # override 2 (field by Field[datetime]) and lastly (if no cache value 
+        # is known) by finding the first field of type Date of the model.
+
+        # The cache (of the field name) lives on the Model, as every 
+        # `Model.query` is a new Query
+        model = self.model
+
+        if isinstance(date_field, str):
+            field = getattr(model, date_field, None)
+            model._date_field_cache = field.get_name() if isinstance(field, Field) else None
+
+        # Internally Field[datetime] does not exist and will always be a Date field
+        elif isinstance(date_field, Date):
+            model._date_field_cache = date_field.get_name()
+
+        elif not model._date_field_cache:
+            try:
+                model._date_field_cache = next(model._fields_of_type(Date)).get_name()
+            
+            except StopIteration:
+                raise ValueError("Could not find any date fields.")
+
+        # If still no correct field is known, return an error.
+        if not model._date_field_cache:
+            if not date_field:
+                raise ValueError(f"Could not find any date fields.")
+            
+            raise ValueError(f"Date Field '{date_field}' not found on model.")
+
+        return model._date_field_cache
+
+
+    @t.overload
+    def latest(self) -> RT | None: ...
+    @t.overload
+    def latest(self, date_field: str) -> RT | None: ...
+    @t.overload
+    def latest(self, date_field: Field[datetime]) -> RT | None: ...
+    def latest(self, date_field: str | Field[datetime] | None = None) -> RT | None:
+        """
+        Get last table row based on Date fields. If no explicit field provided
+        the first field of type Date will be used. Takes in a Field[datetime] 
+        (or) string.
+        """
+        compiled = self._compile("latest", self._date_field(date_field))
+
+        return self._query_one(compiled.sql, self._parameters(compiled))
+
+
+    def update(self, changes: dict[Field[t.Any], t.Any]) -> None:
+        """
+        Will update the provided fields with the provided values for all 
+        selected fields.
+        """
+        compiled, parameters = self._compile_update(changes)
+
+        self._change_evicting(compiled.sql, parameters)
+
+
+    def delete(self) -> int:
+        """
+        Deletes all rows satisfying the query (respecting its order, limit 
+        and offset) in a single statement. Returns the number of deleted 
+        rows.
+        """
+        compiled = self._compile("delete")
+        return self._change_evicting(compiled.sql, self._parameters(compiled))
+
+
+    def _change_evicting(self, sql: str, parameters: tuple[t.Any, ...]) -> int:
+        """
+        Executes an UPDATE or DELETE statement and returns the number of 
+        changed rows. Instances of the changed rows must not be returned by 
+        the active IdentityMap anymore, they are evicted (all instances of 
+        the Model without RETURNING).
+        """
+        identity_map = current_identity_map()
+        if identity_map is None: return change_db(sql, parameters, self.model)
+
+        if SUPPORTS_RETURNING:
+            rows = change_returning(f"{sql.rstrip(';')} RETURNING {self.model._primary_key.get_name()};", parameters, self.model)
+            identity_map.evict(self.model, (row[0] for row in rows))
+
+            return len(rows)
+
+        row_count = change_db(sql, parameters, self.model)
+        identity_map.evict(self.model)
+
+        return row_count
+
+
+    def _compile_update(self, changes: dict[Field[t.Any], t.Any]) -> tuple[CompiledQuery, tuple[t.Any, ...]]:
+        shape: list[tuple[str, t.Hashable]] = []
+        values: list[t.Any] = []
+        expressions: list[tuple[str, Expression]] = []
+
+        # Values may be plain values or expressions such as 
+        # `Giraffe.number + 1`
+        for field, value in changes.items():
+            # Related instances are stored as their primary key
+            if isinstance(field, ForeignKey): value = field._to_pk(value)
+            if value is not None and not isinstance(value, Field | Expression): value = field._to_db(value)
+
+            expression = operand(value)
+            expression._bind(values)
+
+            shape.append((field.get_name(), expression._shape()))
+            expressions.append((field.get_name(), expression))
+
+        compiled = self._compile("update", tuple(shape), expressions)
+
+        return compiled, self._parameters(compiled, tuple(values))
+
+
+    def explain(
+            self, 
+            kind: t.Literal["all", "first", "latest", "count", "exists", "update", "delete"] = "all", 
+            date_field: str | Field[datetime] | None = None, 
+            changes: dict[Field[t.Any], t.Any] | None = None
+        ) -> list[PlanStep]:
+        """
+        Returns the query plan of the statement `all()`, `first()`, 
+        `latest(date_field)`, `count()`, `update(changes)` or `delete()` 
+        would execute, without executing it:
+
+            plan = Giraffe.query.explain("latest")
+            assert not any(step.is_full_scan for step in plan)
+        """
+        if kind == "latest":
+            compiled = self._compile("latest", self._date_field(date_field))
+            parameters = self._parameters(compiled)
+
+        elif kind == "update":
+            if not changes: raise ValueError("Explaining an update requires changes")
+            compiled, parameters = self._compile_update(changes)
+
+        else:
+            compiled = self._compile(kind)
+            parameters = self._parameters(compiled)
+
+        return explain(compiled.sql, parameters)
+
+
+    # --- Async terminal methods ---
+
+    async def all_async(self) -> list[RT]:
+        """
+        Awaitable version of `all()`, executed on the Database worker threads.
+        """
+        return await get_database().run_async(self.all)
+
+
+    async def first_async(self) -> RT | None:
+        """
+        Awaitable version of `first()`, executed on the Database worker threads.
+        """
+        return await get_database().run_async(self.first)
+
+
+    async def latest_async(self, date_field: str | Field[datetime] | None = None) -> RT | None:
+        """
+        Awaitable version of `latest()`, executed on the Database worker 
+        threads.
+        """
+        return await get_database().run_async(self.latest, date_field)
+
+
+    async def update_async(self, changes: dict[Field[t.Any], t.Any]) -> None:
+        """
+        Awaitable version of `update()`, executed on the Database worker 
+        threads.
+        """
+        return await get_database().run_async(self.update, changes)
+
+
+    async def delete_async(self) -> int:
+        """
+        Awaitable version of `delete()`, executed on the Database worker 
+        threads.
+        """
+        return await get_database().run_async(self.delete)
+
+
+    async def create_async(self, **kwargs: dict[str, t.Any]) -> MT:
+        """
+        Awaitable version of `create()`, executed on the Database worker 
+        threads.
+        """
+        return await get_database().run_async(lambda: self.create(**kwargs))
+
+
+    async def __aiter__(self) -> t.AsyncIterator[RT]:
+        # Every step runs on a worker thread and returns its connection to the
+        # pool, so a suspended iteration never holds one (the worker threads
+        # of other coroutines would wait for it forever). Queries which can be 
+        # paged by primary key are fetched a chunk at a time, others at once.
+        if not self._pages_by_pk():
+            for result in await self.all_async():
+                yield result
+
+            return
+
+        query = self if self.__order_by else self.order_by(self.model._primary_key)
+        database = get_database()
+
+        while True:
+            page = await database.run_async(query.page, DEFAULT_CHUNK_SIZE)
+
+            for result in page.items:
+                yield result
+
+            if page.next_cursor is None: break
+            query = query.after(page.next_cursor)
+
+
+    def _pages_by_pk(self) -> bool:
+        """
+        Whether the instances of this query can be fetched in pages ordered by
+        primary key: it is not ordered otherwise, limited or grouped.
+        """
+        if self._mode != QueryMode.MODEL or self.__group_by: return False
+        if self.__limit > -1 or self.__offset > -1: return False
+
+        pk_name = self.model._primary_key.get_name()
+        return all(name == pk_name for name, _ in self.__order_key)
+
+
+def _extend_column(columns: "list[array[t.Any] | list[t.Any]]", index: int, values: tuple[t.Any, ...]) -> None:
+    """
+    Appends values to a column of `Query.columns()`, an array which cannot
+    hold them (NULL integers, or text in a numeric column) becomes a list.
+    """
+    column = columns[index]
+
+    if isinstance(column, array):
+        if column.typecode == "d" and None in values:
+            values = tuple(math.nan if value is None else value for value in values)
+
+        size = len(column)
+
+        try:
+            column.extend(values)
+            return
+
+        except (TypeError, OverflowError):
+            del column[size:]
+            column = columns[index] = column.tolist()
+
+    column.extend(values)
+
+
+def _encode_cursor(names: list[str], values: list[t.Any]) -> str:
+    # Values such as dates are encoded as they are stored, and compared as such
+    payload = json.dumps([names, values], separators=(",", ":"), default=adapt)
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def _decode_cursor(cursor: str) -> tuple[list[str], list[t.Any]]:
+    try:
+        payload = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        names, values = json.loads(payload)
+
+    except (binascii.Error, UnicodeDecodeError, ValueError, TypeError):
+        raise ValueError("Invalid cursor")
+
+    if not isinstance(names, list) or not isinstance(values, list):
+        raise ValueError("Invalid cursor")
+
+    names, values = t.cast(list[str], names), t.cast(list[t.Any], values)
+    if len(names) != len(values): raise ValueError("Invalid cursor")
+
+    return names, values
+
+
+def _cascade_tables(models: t.Iterable[t.Type['Model']]) -> tuple[str, ...]:
+    """
+    The tables of models, and of every Model their ForeignKeys reference with
+    an ON DELETE action (e.g. CASCADE): deleting rows there changes the rows 
+    of models as well.
+    """
+    pending = list(models)
+    seen: set[t.Type['Model']] = set()
+    tables: list[str] = []
+
+    while pending:
+        model = pending.pop()
+        if model in seen: continue
+
+        seen.add(model)
+        tables.append(model._cls_tablename().lower())
+        pending.extend(field.model for field in model._foreign_keys if field.on_delete not in ("RESTRICT", "NO ACTION"))
+
+    return tuple(tables)
+
+
+def _load_in(model: t.Type[MT], field: Field[t.Any], values: t.Iterable[t.Any]) -> list[MT]:
+    """
+    Loads the instances of model whose field is in values, in batches.
+    """
+    values = list(values)
+    instances: list[MT] = []
+
+    query: Query[MT, MT] = Query(model)
+
+    for start in range(0, len(values), DEFAULT_IN_BATCH_SIZE):
+        instances.extend(query.filter(field.in_(values[start:start + DEFAULT_IN_BATCH_SIZE])).all())
+
+    return instances
+
+
+def _prefetch_forward(instances: t.Sequence['Model'], field: ForeignKey[t.Any]) -> None:
+    pks = {pk for instance in instances if (pk := field.pk_of(instance)) is not None}
+    related = {instance._get_pk()[1]: instance for instance in _load_in(field.model, field.model._primary_key, pks)}
+
+    for instance in instances:
+        instance._set_related(field.name, related.get(field.pk_of(instance)))
+
+
+def _prefetch_reverse(instances: t.Sequence['Model'], relation: ReverseRelation[t.Any]) -> None:
+    field = relation.foreign_key
+    by_pk = {instance._get_pk()[1]: instance for instance in instances}
+    related: dict[t.Any, list['Model']] = {pk: [] for pk in by_pk}
+
+    # The loaded instances reference the prefetched instances as well
+    for instance in _load_in(relation.model, field, by_pk):
+        pk = field.pk_of(instance)
+
+        related[pk].append(instance)
+        instance._set_related(field.name, by_pk[pk])
 
-        change_db(query, tuple(values))
+    for pk, instance in by_pk.items():
+        instance._set_related(relation.name, related[pk])
@@ -5,6 +5,10 @@ import typing as t
 #                    cid,  name,  type,  notnull,  dflt_value,  pk
 table_pragma = tuple[int,  str,   str,   int,      t.Any,       int]
 
+#                    0     1      2        3        4
+#                    seq,  name,  unique,  origin,  partial
+index_pragma = tuple[int,  str,   int,     str,     int]
+
 
 
 class RawFieldSchema(t.TypedDict):
@@ -21,9 +25,20 @@ class FieldSchema(RawFieldSchema):
     notnull: bool
     dflt_value: t.Any
     pk: bool
+    references: t.NotRequired[str]
+    on_delete: t.NotRequired[str]
+
+
+class IndexSchema(t.TypedDict):
+    name: str
+    columns: list[str]
+    unique: bool
+    where: str | None
 
 
 class Schema(t.TypedDict):
     tablename: str
     create: list[FieldSchema]
     alter: list[RawFieldSchema]
+    indexes: t.NotRequired[list[IndexSchema]]
+    drop_indexes: t.NotRequired[list[str]]
@@ -0,0 +1,261 @@
+from giraffe_orm.connections import get_database
+from giraffe_orm.identity import IdentityMap
+
+import typing as t
+
+
+if t.TYPE_CHECKING:
+    from .models import Model
+
+
+class Session:
+    """
+    Unit of work which tracks new, changed and deleted Model instances and
+    writes them in batches on `flush()`, committing only once:
+
+        with Session() as session:
+            session.add(Giraffe(primary_key="new"))
+            giraffe.number += 1
+            session.add(giraffe)
+            session.delete(other)
+
+            Giraffe.query.get("loaded").number += 1
+
+    Leaving the block flushes, an exception discards all pending changes.
+    Within the block the Session's IdentityMap is active, so every primary 
+    key loads to a single instance, and instances loaded within the block 
+    are tracked like added ones.
+    """
+
+    def __init__(self) -> None:
+        self._new: dict[int, 'Model'] = {}
+        self._tracked: dict[int, 'Model'] = {}
+        self._deleted: dict[int, 'Model'] = {}
+
+        self.identity_map = IdentityMap()
+
+
+    def __enter__(self) -> t.Self:
+        self.identity_map.__enter__()
+        return self
+
+    def __exit__(self, exc_type: t.Any, *args: t.Any) -> None:
+        try:
+            if exc_type:
+                self.rollback()
+                return
+
+            self.flush()
+
+        finally:
+            self.identity_map.__exit__(exc_type, *args)
+
+
+    @property
+    def new(self) -> list['Model']:
+        return list(self._new.values())
+
+    @property
+    def dirty(self) -> list['Model']:
+        return [instance for instance in self._loaded().values() if instance._get_changes()]
+
+    @property
+    def deleted(self) -> list['Model']:
+        return list(self._deleted.values())
+
+
+    def add(self, instance: 'Model') -> None:
+        """
+        Adds a new instance to be inserted, or a loaded instance whose changes
+        should be saved.
+        """
+        key = id(instance)
+
+        if key in self._deleted: del self._deleted[key]
+
+        if instance._persisted:
+            self._tracked[key] = instance
+            self.identity_map.add(instance)
+
+        else:
+            self._new[key] = instance
+
+
+    def add_all(self, instances: t.Iterable['Model']) -> None:
+        for instance in instances:
+            self.add(instance)
+
+
+    def delete(self, instance: 'Model') -> None:
+        key = id(instance)
+
+        # Deleting an instance which was never inserted only cancels the insert
+        if self._new.pop(key, None) is not None: return
+
+        self._tracked.pop(key, None)
+        self._deleted[key] = instance
+
+
+    def rollback(self) -> None:
+        """
+        Discards all pending changes.
+        """
+        self._new.clear()
+        self._tracked.clear()
+        self._deleted.clear()
+        self.identity_map.clear()
+
+
+    def flush(self) -> None:
+        """
+        Writes all pending changes in a single transaction. Inserts run first,
+        then updates, then deletes, each batched per table. Tables are 
+        inserted into before the tables whose ForeignKeys reference them, and
+        deleted from after those.
+        """
+        changed = self.dirty
+        if not self._new and not changed and not self._deleted: return
+
+        new = _group_by_model(self._new.values())
+        dirty = _group_by_model(changed)
+        deleted = _group_by_model(self._deleted.values())
+
+        # Instances are marked as saved by every batch, restore them when the
+        # transaction as a whole is rolled back.
+        snapshots = [
+            (instance, dict(instance._data), dict(instance._original_data), instance._persisted)
+            for instance in (*self._new.values(), *changed)
+        ]
+
+        try:
+            with get_database().transaction():
+                self._flush(new, dirty, deleted)
+
+        except:
+            for instance, data, original_data, persisted in snapshots:
+                instance._data = data
+                instance._original_data = original_data
+                instance._persisted = persisted
+
+            raise
+
+        for instance in self._deleted.values():
+            self.identity_map.remove(instance)
+            instance._persisted = False
+
+        for instance in self._new.values():
+            self.identity_map.add(instance)
+
+        # Saved instances no longer have to be kept alive
+        self.identity_map._changed.clear()
+
+        self._tracked.update(self._new)
+        self._new.clear()
+        self._deleted.clear()
+
+
+    def _loaded(self) -> dict[int, 'Model']:
+        """
+        The added and loaded instances, whose changes are saved on flush.
+        """
+        instances = {id(instance): instance for instance in self.identity_map}
+        instances.update(self._tracked)
+
+        for key in (*self._new, *self._deleted):
+            instances.pop(key, None)
+
+        return instances
+
+
+    def _flush(self, new: dict[t.Type['Model'], list['Model']], dirty: dict[t.Type['Model'], list['Model']], deleted: dict[t.Type['Model'], list['Model']]) -> None:
+        for model in _sort_models(new):
+            instances = new[model]
+
+            # Instances referencing a new instance of the same Model (e.g. the
+            # parent in a tree) are inserted once it has its primary key
+            while instances:
+                ready = [instance for instance in instances if not _waits(instance)] or instances
+                self._insert(model, ready)
+
+                inserted = set(map(id, ready))
+                instances = [instance for instance in instances if id(instance) not in inserted]
+
+        for model, instances in dirty.items():
+            for instance in instances: _refresh_foreign_keys(instance)
+            model.query.bulk_update(instances)
+
+        for model in reversed(_sort_models(deleted)):
+            model.query._delete_pks(instance._get_pk()[1] for instance in deleted[model])
+
+
+    def _insert(self, model: t.Type['Model'], instances: list['Model']) -> None:
+        pk_name = model._primary_key.get_name()
+
+        for instance in instances: _refresh_foreign_keys(instance)
+
+        # Rows without a primary key need their assigned key back, those
+        # with a key can be inserted with executemany.
+        with_pk = [instance for instance in instances if instance._data.get(pk_name) is not None]
+        without_pk = [instance for instance in instances if instance._data.get(pk_name) is None]
+
+        if with_pk: model.query.bulk_create(with_pk)
+        if without_pk: model.query.bulk_create(without_pk, return_pks=True)
+
+
+    def commit(self) -> None:
+        self.flush()
+
+
+def _sort_models(models: t.Iterable[t.Type['Model']]) -> list[t.Type['Model']]:
+    """
+    Orders models so every Model follows the models (among those provided) 
+    its ForeignKeys reference. Models referencing each other in a cycle keep
+    their order.
+    """
+    models = list(models)
+    ordered: list[t.Type['Model']] = []
+    visiting: set[t.Type['Model']] = set()
+
+    def visit(model: t.Type['Model']) -> None:
+        if model in visiting: return
+        visiting.add(model)
+
+        for field in model._foreign_keys:
+            if field.model in models: visit(field.model)
+
+        ordered.append(model)
+
+    for model in models: visit(model)
+
+    return ordered
+
+
+def _refresh_foreign_keys(instance: 'Model') -> None:
+    """
+    Stores the primary key of the related instances assigned to the 
+    ForeignKeys of instance, which new related instances only got on insert.
+    """
+    for field in instance._foreign_keys:
+        found, related = instance._get_related(field.name)
+        if found and related is not None: instance._data[field.name] = field._to_pk(related)
+
+
+def _waits(instance: 'Model') -> bool:
+    """
+    Whether instance references a new instance which is not inserted yet.
+    """
+    for field in instance._foreign_keys:
+        found, related = instance._get_related(field.name)
+        if not found or related is None or related is instance or related._persisted: continue
+        if field._to_pk(related) is None: return True
+
+    return False
+
+
+def _group_by_model(instances: t.Iterable['Model']) -> dict[t.Type['Model'], list['Model']]:
+    groups: dict[t.Type['Model'], list['Model']] = {}
+
+    for instance in instances:
+        groups.setdefault(type(instance), []).append(instance)
+
+    return groups
@@ -1,30 +1,113 @@
+import typing as t
+import threading
+import sqlite3
+
+
+if t.TYPE_CHECKING:
+    from .connections import Database
+
+
+class PinnedConnection:
+    """
+    The connection of a transaction, shared by the calls running within it
+    (see `Database.run_async()`).
+    """
+
+    __slots__ = ("conn", "depth", "written", "lock")
+
+    def __init__(self, conn: sqlite3.Connection) -> None:
+        self.conn = conn
+        self.depth = 0
+
+        # The tables written within the transaction, None for statements 
+        # whose table is unknown
+        self.written: set[str | None] = set()
+
+        # Async calls within the transaction run on its connection one at a 
+        # time
+        self.lock = threading.Lock()
+
+
 class Transaction:
-    def __init__(self, connection):
-        self.conn = connection
+    """
+    Pins a single connection of the Database to the current context (the 
+    thread, or the asyncio task, which enters it). Every statement within 
+    the block runs on it, also those of `*_async` calls (and of tasks created
+    within the block), and is committed once at the end, or rolled back when the block raises. Nested 
+    transactions become savepoints, which only roll back their own block:
+
+        with db.transaction():
+            giraffe.save()
+            await other.save_async()
+
+            with db.transaction():
+                ...
+    """
 
-    def __enter__(self):
-        self.conn.execute("BEGIN;")
+    def __init__(self, database: 'Database', immediate: bool = False) -> None:
+        self.database = database
+        self.immediate = immediate
 
-    def __exit__(self, exc_type, exc_val, exc_tb):
-        if exc_type: 
-            self.conn.execute("ROLLBACK;")
+        self.pinned: PinnedConnection | None = None
+        self.savepoint: str | None = None
+
+    def __enter__(self) -> sqlite3.Connection:
+        pinned = self.database._pin.get()
+
+        if pinned is not None:
+            pinned.depth += 1
+            self.savepoint = f"sp_{pinned.depth}"
+
+            pinned.conn.execute(f"SAVEPOINT {self.savepoint};")
 
         else:
-            self.conn.execute("COMMIT;")
+            conn = self.database._checkout()
 
+            try:
+                # IMMEDIATE takes the write lock upfront, which avoids busy
+                # errors when a read transaction later has to be upgraded.
+                conn.execute("BEGIN IMMEDIATE;" if self.immediate else "BEGIN;")
 
-"""
-class Database:
-    def __init__(self, conn):
-        self.conn = conn
+            except:
+                self.database._checkin(conn)
+                raise
+
+            pinned = PinnedConnection(conn)
+            self.database._pin.set(pinned)
+
+        self.pinned = pinned
+        return pinned.conn
+
+    def __exit__(self, exc_type: t.Any, exc_val: t.Any, exc_tb: t.Any) -> None:
+        pinned = t.cast(PinnedConnection, self.pinned)
+        conn = pinned.conn
+
+        if self.savepoint:
+            pinned.depth -= 1
+
+            if exc_type:
+                conn.execute(f"ROLLBACK TO {self.savepoint};")
+
+            conn.execute(f"RELEASE {self.savepoint};")
+            return
+
+        try:
+            # A failed statement may already have ended the transaction
+            if exc_type:
+                if conn.in_transaction: conn.execute("ROLLBACK;")
+
+            else:
+                conn.execute("COMMIT;")
 
-    def transaction(self):
-        return Transaction(self.conn)
+        finally:
+            # Never hand a connection with an open transaction back to the 
+            # pool (e.g. when COMMIT itself failed)
+            if conn.in_transaction: conn.rollback()
 
-with db.transaction():
-    giraffe = Giraffe(date=...)
-    giraffe.save()
-    other = OtherModel(...)
-    other.save()
+            self.database._pin.set(None)
+            self.database._checkin(conn)
 
-"""
+            # Results cached by other connections while this transaction was
+            # writing may be outdated now that it ended
+            for table in pinned.written:
+                self.database.result_cache.invalidate(table)